@@ -1 +0,0 @@
-import numpy as np
\ No newline at end of file
@@ -0,0 +1,4 @@
+import sys
+from Murphy.batch import main
+
+sys.exit(main())
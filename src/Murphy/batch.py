@@ -0,0 +1,191 @@
+'''Headless batch runs: solve or optimize many bed designs on worker processes.
+
+    python -m Murphy designs.jsonl --output results.jsonl --processes 8
+
+Every input line is a JSON object describing one design. Fields that are left out take the values of the
+reference design in murphy.py:
+
+    {"id": "room-12", "deployed_height": 15, "stowed_height": 40,
+     "bedframe": {"x": 10, "y": 4, "thickness": 10, "length": 72, "margin": 12, "angle": 8},
+     "A": {"x": 0, "y": 0, "length": 10, "width": 4, "angle": 80, "attachment": [5, 2]},
+     "B": {"x": 20, "y": -1, "length": 10, "width": 4, "angle": 110, "attachment": [18, 2]},
+     "mode": "solve", "angle_steps": 5}
+
+More links are given as "C", "D", ... like "A" and "B". A link can name the link it is mounted on
+("mount": "B", its pivot then rides on that link's distal end) and the link its attachment is on
+("attached_to": "A", instead of the bedframe); "attachment": null leaves a link unattached.
+
+mode "optimize" also takes "strategy", "iterations" and "options" (see MurphyBed.optimize), and mode "tolerance"
+takes "tolerances" and "samples" and adds the summary of a Monte Carlo tolerance analysis of the solved design
+(see Murphy.tolerance), e.g. "tolerances": {"A.x": 0.04, "B.length": ["uniform", 0.02]}. A line with
+"ranges", e.g. {"id": "grid", "ranges": {"A.length": [8, 12, 5], "B.x": [18, 22, 3]}}, stands for every
+combination of np.linspace(start, stop, num) of those design variables (see Design.names), with ids grid/0,
+grid/1, ...
+
+One JSON line is written per design as soon as it finishes, so results come back in completion order; each
+carries its id. A design that cannot be solved gives a line with an "exception" instead of a murphy_error.
+With --previews DIR an image of every solved sweep is written there too (see Murphy.render); otherwise nothing
+here imports matplotlib.
+'''
+import argparse
+import itertools
+import json
+import os
+import sys
+import traceback
+from multiprocessing import Pool
+from time import perf_counter
+import numpy as np
+from Murphy.bedframe import Bedframe
+from Murphy.link import Link
+from Murphy.murphy import Murphy
+from Murphy.murphy_bed import MurphyBed
+from Murphy.design import Design
+from Murphy.optimize import StoppingCriteria
+
+# The reference design of murphy.py
+defaults = {'deployed_height': 15, 'stowed_height': 40, 'mode': 'solve', 'angle_steps': 5,
+            'strategy': 'nelder-mead', 'iterations': 100, 'options': {}, 'tolerances': {}, 'samples': 1000,
+            'bedframe': {'x': 10, 'y': 4, 'thickness': 10, 'length': 72, 'margin': 12, 'angle': 8},
+            'A': {'x': 0, 'y': 0, 'length': 10, 'width': 4, 'angle': 80, 'attachment': [5, 2]},
+            'B': {'x': 20, 'y': -1, 'length': 10, 'width': 4, 'angle': 110, 'attachment': [18, 2]}}
+
+colors = {'A': 'r', 'B': 'g', 'C': 'b', 'D': 'm', 'E': 'c'}
+
+def link_labels(spec):
+    '''A, B and the labels of any further links of a job, in order'''
+    return ['A', 'B'] + sorted(key for key in spec if len(key) == 1 and key.isupper() and key not in 'AB')
+
+def build(spec):
+    '''The Murphy described by a job'''
+    bedframe = Bedframe(**spec['bedframe'])
+    links = {}
+    for label in link_labels(spec):
+        options = dict(spec[label])
+        for joint in ['mount', 'attached_to']:
+            if options.get(joint) is not None:
+                options[joint] = links[options[joint]]
+        if options.get('mount') is not None:
+            options.setdefault('x', 0)
+            options.setdefault('y', 0)
+        links[label] = Link(color = colors.get(label, 'k'), bedframe = bedframe, **options)
+    return Murphy(bedframe, *links.values())
+
+def with_defaults(spec):
+    job = dict(defaults)
+    job.update(spec)
+    for part in ['bedframe', 'A', 'B']:
+        job[part] = dict(defaults[part], **spec.get(part, {}))
+    return job
+
+def expand(spec, line_number):
+    '''The jobs an input line stands for'''
+    job = with_defaults(spec)
+    job.setdefault('id', str(line_number))
+    ranges = job.pop('ranges', None)
+    if not ranges:
+        return [job]
+    names = list(ranges)
+    design = Design.from_murphy(build(job))
+    jobs = []
+    for i, values in enumerate(itertools.product(*[np.linspace(*ranges[name]) for name in names])):
+        point = dict(job, id = '{}/{}'.format(job['id'], i))
+        for part in ['bedframe'] + link_labels(job):
+            point[part] = dict(job[part])
+        for name, value in zip(names, values):
+            if name not in design.names:
+                raise ValueError('{} is not a design variable, expected one of {}'.format(name, ', '.join(design.names)))
+            label, variable = name.split('.', 1)
+            if variable.startswith('attachment.'):
+                attachment = list(point[label]['attachment'])
+                attachment['xy'.index(variable[-1])] = float(value)
+                point[label]['attachment'] = attachment
+            else:
+                point[label][variable] = float(value)
+        jobs.append(point)
+    return jobs
+
+def read_jobs(lines):
+    for line_number, line in enumerate(lines, 1):
+        if line.strip():
+            yield from expand(json.loads(line), line_number)
+
+def run_job(job):
+    '''Solve or optimize one design. Returns the result line as a dict; this runs in a worker process.'''
+    start = perf_counter()
+    result = {'id': job['id'], 'mode': job['mode']}
+    try:
+        murphy_bed = MurphyBed(build(job), job['deployed_height'], job['stowed_height'])
+        murphy_bed.solve_over_full_range(job['angle_steps'])
+        if job['mode'] == 'optimize':
+            result['initial_murphy_error'] = float(murphy_bed.murphy_error[0])
+            optimizer = murphy_bed.optimize(job['strategy'], job['angle_steps'], processes = 1,
+                                            stopping = StoppingCriteria(max_iterations = job['iterations']), **job['options'])
+            result['iterations'], result['evaluations'] = len(optimizer.history), optimizer.stats['evaluations']
+            result['pruned'] = sum(optimizer.stats['pruned'])
+        elif job['mode'] == 'tolerance':
+            from Murphy.tolerance import ToleranceAnalysis
+            result['tolerance'] = ToleranceAnalysis(murphy_bed, job['tolerances'], job['samples']).run()
+        elif job['mode'] != 'solve':
+            raise ValueError('Unknown mode {!r}, expected solve, optimize or tolerance'.format(job['mode']))
+        error, terms = murphy_bed.murphy_error
+        design = Design.from_murphy(murphy_bed.bed)
+        result.update({'murphy_error': float(error), 'terms': [float(term) for term in terms],
+                       'design': dict(zip(design.names, design.values.tolist())),
+                       'failed_angles': murphy_bed.collected_solutions.failed_angles.tolist()})
+        if job.get('preview'):
+            from Murphy.render import render_sweep
+            render_sweep(murphy_bed, job['preview'])
+            result['preview'] = job['preview']
+    except Exception as e:
+        result['exception'] = '{}: {}'.format(type(e).__name__, e)
+        result['traceback'] = traceback.format_exc()
+    result['seconds'] = perf_counter() - start
+    return result
+
+def with_previews(jobs, directory):
+    '''Jobs that also write a preview image of their sweep to directory'''
+    for job in jobs:
+        yield dict(job, preview = os.path.join(directory, job['id'].replace('/', '_') + '.png'))
+
+def run(jobs, output, processes = None):
+    '''Run jobs on processes workers (1 runs them here), writing each result line to output as it finishes.
+    Returns the number of designs that raised an exception.'''
+    failures = 0
+    if processes == 1:
+        results = map(run_job, jobs)
+        pool = None
+    else:
+        pool = Pool(processes)
+        results = pool.imap_unordered(run_job, jobs)
+    try:
+        for result in results:
+            failures += 'exception' in result
+            output.write(json.dumps(result) + '\n')
+            output.flush()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return failures
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(prog = 'python -m Murphy', description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help = 'JSONL file of designs, - for stdin')
+    parser.add_argument('--output', help = 'JSONL file to append results to, default stdout')
+    parser.add_argument('--processes', type = int, default = None, help = 'worker processes, default one per CPU')
+    parser.add_argument('--previews', metavar = 'DIR', help = 'write an image of every solved sweep to DIR')
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == '-' else open(args.input)
+    output = open(args.output, 'a') if args.output else sys.stdout
+    try:
+        jobs = read_jobs(source)
+        if args.previews:
+            os.makedirs(args.previews, exist_ok = True)
+            jobs = with_previews(jobs, args.previews)
+        failures = run(jobs, output, args.processes)
+    finally:
+        if source is not sys.stdin: source.close()
+        if output is not sys.stdout: output.close()
+    return 1 if failures else 0
@@ -1,31 +1,40 @@
-import numpy as np
 from math import radians, sin, cos
-import matplotlib.pyplot as plt
-from sklearn.linear_model import LinearRegression as LR
 
 class Bedframe():
-    def __init__(self, x,y, thickness, length, margin, angle):
+    # Single-pose geometry is plain math on the cached trig; kinematics.bedframe_geometry is the batch version
+    __slots__ = ('x', 'y', 'angle', 't', 'l', 'margin', 'depth_of_headboard', 'h_headboard', '_trig')
+
+    def __init__(self, x,y, thickness, length, margin, angle, depth_of_headboard = 0, h_headboard = 0):
         '''Design elements'''
         self.t = thickness
         self.l = length
         self.margin = margin # the distance from the edges to the point where a link can be connected
+        self.depth_of_headboard, self.h_headboard = depth_of_headboard, h_headboard # headboard at the head end, above the frame
         
         '''Current Position'''
         self.x, self.y = x,y
         '''Angle in degrees, 0 is deployed, 90 is stowed'''
         self.angle = angle
+        self._trig = None, None
+
+    @property
+    def trig(self):
+        '''cos and sin of the bed angle, kept until the angle changes'''
+        angle = self.angle
+        if self._trig[0] != angle:
+            theta = radians(angle)
+            self._trig = angle, (cos(theta), sin(theta))
+        return self._trig[1]
 
     @property
     def lower_foot(self):
-        theta = radians(self.angle)
-        return self.x + self.l*cos(theta), self.y + self.l*sin(theta)
+        c, s = self.trig
+        return self.x + self.l*c, self.y + self.l*s
 
     @property
     def upper_foot(self):
-        theta = radians(self.angle)
-        x = self.x + self.l*cos(theta) - self.t*sin(theta)
-        y = self.y + self.l*sin(theta) + self.t*cos(theta)
-        return x, y
+        c, s = self.trig
+        return self.x + self.l*c - self.t*s, self.y + self.l*s + self.t*c
 
     @property
     def lower_head(self):
@@ -33,76 +42,85 @@ class Bedframe():
 
     @property
     def upper_head(self):
-        theta = radians(self.angle)
-        x = self.x - self.t*sin(theta)
-        y = self.y + self.t*cos(theta)
-        return x,y 
+        c, s = self.trig
+        return self.x - self.t*s, self.y + self.t*c
+
+    @property
+    def corners(self):
+        '''lower_head, lower_foot, upper_foot and upper_head, in order around the frame'''
+        c, s = self.trig
+        x, y, l, t = self.x, self.y, self.l, self.t
+        return (x, y), (x + l*c, y + l*s), (x + l*c - t*s, y + l*s + t*c), (x - t*s, y + t*c)
 
     @property
     def left_edge(self):
-        return min(self.lower_foot[0], self.lower_head[0], self.upper_foot[0], self.upper_head[0])
+        a, b, c, d = self.corners
+        return min(a[0], b[0], c[0], d[0])
 
     @property
     def right_edge(self):
-        return max(self.lower_foot[0], self.lower_head[0], self.upper_foot[0], self.upper_head[0])
+        a, b, c, d = self.corners
+        return max(a[0], b[0], c[0], d[0])
 
     @property
     def top(self):
-        return max(self.lower_foot[1], self.lower_head[1], self.upper_foot[1], self.upper_head[1])
+        a, b, c, d = self.corners
+        return max(a[1], b[1], c[1], d[1])
 
     @property
     def bottom(self):
-        return min(self.lower_foot[1], self.lower_head[1], self.upper_foot[1], self.upper_head[1])
+        a, b, c, d = self.corners
+        return min(a[1], b[1], c[1], d[1])
 
     def _offset_point(self, p, p1, p2, offset):
+        '''The point offset from corner p by a distance offset along each of the edges towards p1 and p2'''
         x, y = p
-        x1, y1, = p1
+        x1, y1 = p1
         x2, y2 = p2
-
-        #vector1
         d1 = (((x1-x)**2 + (y1-y)**2)**.5)/offset
-        v1 = (x1-x)/d1, (y1-y)/d1
-
-        #vector from (x,y) to (x2,y2)
         d2 = (((x2-x)**2 + (y2-y)**2)**.5)/offset
-        v2 = (x2-x)/d2, (y2-y)/d2
-
-        return x + v1[0] + v2[0], y + v1[1] + v2[1]
-
+        return x + (x1-x)/d1 + (x2-x)/d2, y + (y1-y)/d1 + (y2-y)/d2
 
     @property
     def head_lower_margin(self):
-        return self._offset_point(self.lower_head, self.lower_foot, self.upper_head, self.margin)
+        lower_head, lower_foot, _, upper_head = self.corners
+        return self._offset_point(lower_head, lower_foot, upper_head, self.margin)
 
     @property
     def head_upper_margin(self):
-        return self._offset_point(self.upper_head, self.lower_head, self.upper_foot, self.margin)
+        lower_head, _, upper_foot, upper_head = self.corners
+        return self._offset_point(upper_head, lower_head, upper_foot, self.margin)
 
     @property
     def foot_lower_margin(self):
-        return self._offset_point(self.lower_foot, self.upper_foot, self.lower_head, self.margin)
+        lower_head, lower_foot, upper_foot, _ = self.corners
+        return self._offset_point(lower_foot, upper_foot, lower_head, self.margin)
 
     @property
     def foot_upper_margin(self):
-        return self._offset_point(self.upper_foot, self.upper_head, self.lower_foot, self.margin)
+        _, lower_foot, upper_foot, upper_head = self.corners
+        return self._offset_point(upper_foot, upper_head, lower_foot, self.margin)
 
 
 
-    # @property
-    # def floor_opening(self):
-    #     if (self.bottom >= 0) or (self.top <= 0):
-    #         return 0
-        
-    #     #topside
-    #     if np.sign(self.upper_head[1]) == np.sign(self.upper_foot[1]):
-    #         topside = 0
-    #     else:
-    #         ys = np.array([[self.upper_head[1]], [self.upper_head[1]])
-    #         xs = np.array([[self.upper_head[0]],[self.lower_head[0]]])
-    #         topside = LR().fit(ys, xs).predict([[0]])[0]
+    @property
+    def extents(self):
+        xs, ys = zip(*self.corners)
+        return {'left': min(xs), 'right': max(xs), 'top': max(ys), 'bottom': min(ys)}
+
+    @property
+    def floor_opening(self):
+        '''The furthest point along the floor (y = 0) covered by the bedframe, from the edges that cross it'''
+        corners = self.corners
+        floor_opening = 0
+        for (x0, y0), (x1, y1) in zip(corners, corners[1:] + corners[:1]):
+            if y0*y1 < 0:
+                floor_opening = max(floor_opening, x0 - y0*(x1-x0)/(y1-y0))
+        return floor_opening
 
 
     def plot(self, ax = None):
+        import matplotlib.pyplot as plt
         color = 'k'
         plot_here = False
         if not ax:
@@ -135,5 +153,4 @@ class Bedframe():
 if __name__ == '__main__':
     b = Bedframe(0,0, 15, 80, 2, 10)
     b.plot()
-    plt.show()
 
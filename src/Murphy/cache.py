@@ -0,0 +1,61 @@
+from collections import OrderedDict
+import os
+import pickle
+import numpy as np
+
+class PoseCache():
+    '''Bounded LRU cache for solved poses and sweeps.
+
+    Keys are the design vector quantized to resolution plus whatever else the result depends on (bed angle,
+    solver settings). The full-precision design is stored with each entry, so a lookup can tell an exact repeat,
+    whose result can be reused as is, from a nearby design in the same quantum, whose result is only a good
+    warm start. At most maxsize entries are kept; the least recently used ones are dropped first.
+    If path is given, entries saved there by a previous run are loaded, and save() writes them back.'''
+    def __init__(self, maxsize = 100000, resolution = 1e-3, path = None):
+        self.maxsize, self.resolution, self.path = maxsize, resolution, path
+        self._entries = OrderedDict()
+        self.hits = self.near_hits = self.misses = 0
+        if path and os.path.exists(path):
+            with open(path, 'rb') as f:
+                self._entries.update(pickle.load(f))
+
+    def key(self, design, *extra):
+        return (tuple(np.round(np.asarray(design)/self.resolution).astype(np.int64).tolist()),) + extra
+
+    def lookup(self, key, design):
+        '''Returns (value, exact), or (None, False) on a miss'''
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, False
+        self._entries.move_to_end(key)
+        stored_design, value = entry
+        exact = np.array_equal(stored_design, design)
+        if exact:
+            self.hits += 1
+        else:
+            self.near_hits += 1
+        return value, exact
+
+    def store(self, key, design, value):
+        self._entries[key] = (np.array(design, dtype = float), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last = False)
+
+    @property
+    def stats(self):
+        lookups = self.hits + self.near_hits + self.misses
+        return {'hits': self.hits, 'near_hits': self.near_hits, 'misses': self.misses, 'size': len(self._entries),
+                'hit_rate': (self.hits + self.near_hits)/lookups if lookups else 0}
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.near_hits = self.misses = 0
+
+    def save(self, path = None):
+        with open(path or self.path, 'wb') as f:
+            pickle.dump(self._entries, f)
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,127 @@
+'''Interference checks over a whole sweep.
+
+Parts are modelled the way they are drawn: the bedframe as its rotated rectangle, a link as a capsule (its centre
+line from pivot to distal point, swept by a disc of radius width/2), and the mount of a link as the disc at its
+pivot. Every function works on all solved angles at once. A bounding box broadphase picks the angles at which a
+pair could touch, and only those go through the exact narrowphase, a separating axis test for capsule against
+rectangle and the distance between centre lines for capsule against capsule.
+
+The pairs checked are the bedframe against each link mount fixed to the room, the bedframe against each link, and
+the links against each other. A link attached to the bedframe always overlaps it at its distal end, which is pinned
+there, and no translation separates the two, so the separating axis depth says nothing about it. Its depth is
+instead the length of its centre line inside the bedframe, leaving out the end cap at the attachment: 0 for a link
+that leaves the frame within its own half width, and up to the whole link for one passing through the bed.
+Two links joined to each other, one mounted or attached on the other, are not checked, as they always overlap.
+
+Points are arrays with x and y along the last axis, the xy of a PointArray (see Murphy.geometric_objects).
+Depths are in inches, 0 where parts are clear.
+'''
+import numpy as np
+from Murphy.kinematics import sweep_geometry
+from Murphy.geometric_objects import segment_distance
+
+corner_names = ['lower_head', 'lower_foot', 'upper_foot', 'upper_head']
+
+def _box(points, radius = 0):
+    '''Bounding boxes (lower corner, upper corner) of points of shape (n, k, 2), grown by radius'''
+    return points.min(axis=1) - radius, points.max(axis=1) + radius
+
+def boxes_overlap(box1, box2):
+    return ((box1[0] < box2[1]) & (box2[0] < box1[1])).all(axis=-1)
+
+def _perpendicular(v):
+    return np.stack([-v[..., 1], v[..., 0]], axis=-1)
+
+def capsule_rectangle_depth(p0, p1, radius, corners):
+    '''Penetration depth of capsules p0-p1 (n, 2) of the given radius into rectangles (n, 4, 2), by the separating
+    axis test. The axes are the rectangle edges, the capsule normal, and the directions from each corner to the
+    nearest point of the capsule centre line, which cover the rounded ends.'''
+    edge = corners[:, 1] - corners[:, 0]
+    d = p1 - p0
+    length2 = (d*d).sum(axis=-1)
+    t = ((corners - p0[:, None])*d[:, None]).sum(axis=-1)/np.where(length2 > 0, length2, 1)[:, None]
+    nearest = p0[:, None] + np.clip(t, 0, 1)[..., None]*d[:, None]
+    axes = np.concatenate([np.stack([edge, _perpendicular(edge), _perpendicular(d)], axis=1), corners - nearest], axis=1)
+    # a degenerate axis (a point capsule, or a corner on the centre line) falls back to the first edge
+    length = np.linalg.norm(axes, axis=-1, keepdims=True)
+    degenerate = length < 1e-12
+    axes = np.where(degenerate, axes[:, :1], axes)/np.where(degenerate, length[:, :1], length)
+
+    rectangle = np.einsum('nkd,nvd->nkv', axes, corners)
+    ends = np.einsum('nkd,nvd->nkv', axes, np.stack([p0, p1], axis=1))
+    # how far the capsule has to move along each axis to clear the rectangle, whichever way is shorter
+    overlap = np.minimum(rectangle.max(axis=-1) - (ends.min(axis=-1) - radius), (ends.max(axis=-1) + radius) - rectangle.min(axis=-1))
+    return np.maximum(overlap.min(axis=-1), 0)
+
+def inside_length(p0, p1, corners):
+    '''Length of the segments p0-p1 (n, 2) inside rectangles (n, 4, 2), by clipping them to the rectangle slabs'''
+    origin = corners[:, 0]
+    edges = np.stack([corners[:, 1] - origin, corners[:, 3] - origin], axis=1)
+    size = np.linalg.norm(edges, axis=-1)
+    axes = edges/size[..., None]
+    a = np.einsum('nkd,nd->nk', axes, p0 - origin)
+    d = np.einsum('nkd,nd->nk', axes, p1 - p0)
+    # where the segment runs parallel to a side, it is inside that slab everywhere or nowhere
+    parallel = d == 0
+    within = np.where((a >= 0) & (a <= size), np.inf, -np.inf)
+    d = np.where(parallel, 1, d)
+    t0, t1 = -a/d, (size - a)/d
+    lower = np.where(parallel, -within, np.minimum(t0, t1)).max(axis=-1)
+    upper = np.where(parallel, within, np.maximum(t0, t1)).min(axis=-1)
+    return np.maximum(np.clip(upper, 0, 1) - np.clip(lower, 0, 1), 0)*np.linalg.norm(p1 - p0, axis=-1)
+
+def capsule_capsule_depth(a0, a1, radius_a, b0, b1, radius_b):
+    '''Penetration depth of two capsules, from the distance between their centre lines'''
+    return np.maximum(radius_a + radius_b - segment_distance(a0, a1, b0, b1), 0)
+
+def _narrowphase(candidates, depth, *arrays):
+    '''depth evaluated on the rows of arrays only where candidates is true, 0 elsewhere'''
+    result = np.zeros(candidates.shape)
+    index = np.flatnonzero(candidates)
+    if len(index):
+        result[index] = depth(*[array[index] for array in arrays])
+    return result
+
+def collision_depths(design, states, components = None):
+    '''Penetration depth of each checked pair at every solved angle, as {pair name: array over states}.
+    design is the Murphy whose dimensions are used and states the rows of a SolutionStore. components are the
+    bedframe and link geometry for those states, [bedframe, A, B, ...], if they have been computed already.'''
+    links, labels = design.links, design.labels
+    if components is None:
+        components = sweep_geometry(design, states)
+    n = len(states)
+
+    corners = np.stack([components[0][name].xy for name in corner_names], axis=-2).reshape(n, 4, 2)
+    frame_box = _box(corners)
+    capsules = []
+    for link, geometry in zip(links, components[1:]):
+        pivot = geometry['pivot'].xy.reshape(n, 2)
+        distal = geometry['distal'].xy.reshape(n, 2)
+        capsules.append((pivot, distal, link.width/2))
+
+    depths = {}
+    for label, link, (pivot, _, radius) in zip(labels, links, capsules):
+        if link.mount is not None:
+            continue
+        candidates = boxes_overlap(frame_box, _box(pivot[:, None], radius))
+        depths['bedframe/' + label + '.pivot'] = _narrowphase(candidates, lambda p, c: capsule_rectangle_depth(p, p, radius, c), pivot, corners)
+    for label, link, (pivot, distal, radius) in zip(labels, links, capsules):
+        if link.attachment is not None and link.attached_to is None:
+            # the centre line from the edge of the end cap pinned at the attachment back to the pivot
+            d = pivot - distal
+            length = np.linalg.norm(d, axis=-1, keepdims=True)
+            start = distal + d*np.minimum(radius/np.where(length > 0, length, 1), 1)
+            candidates = boxes_overlap(frame_box, _box(np.stack([start, pivot], axis=1)))
+            depths['bedframe/' + label] = _narrowphase(candidates, inside_length, start, pivot, corners)
+        else:
+            candidates = boxes_overlap(frame_box, _box(np.stack([pivot, distal], axis=1), radius))
+            depths['bedframe/' + label] = _narrowphase(candidates, lambda p0, p1, c: capsule_rectangle_depth(p0, p1, radius, c), pivot, distal, corners)
+    for i in range(len(links)):
+        for j in range(i + 1, len(links)):
+            if any(joint is links[i] for joint in (links[j].mount, links[j].attached_to)) or \
+               any(joint is links[j] for joint in (links[i].mount, links[i].attached_to)):
+                continue
+            (a0, a1, ra), (b0, b1, rb) = capsules[i], capsules[j]
+            candidates = boxes_overlap(_box(np.stack([a0, a1], axis=1), ra), _box(np.stack([b0, b1], axis=1), rb))
+            depths[labels[i] + '/' + labels[j]] = _narrowphase(candidates, lambda a0, a1, b0, b1: capsule_capsule_depth(a0, a1, ra, b0, b1, rb), a0, a1, b0, b1)
+    return depths
@@ -0,0 +1,133 @@
+'''Simultaneous solve of the loop-closure constraints of a Murphy with any number of links.
+
+The unknowns are the bedframe position (x, y) and the angle of every link; the bed angle is fixed. Every link with
+an attachment point closes a loop: its distal end has to meet that point, which gives two equations per attached
+link. A link's distal end moves with its own angle and with the angles of the links it is mounted on, and its
+attachment point moves with the bedframe position, or with the angle (and mounts) of the link it is attached to.
+So each row of the Jacobian has a few nonzeros however many links there are, and it is built as COO triplets
+(row, column, value) straight from the current pose.
+
+Each Levenberg-Marquardt step solves (J'J + damping*diag(J'J)) step = -J'r, where r is the gap at every
+attachment; the sum of r**2 is the Murphy's ikea_error. Building r and J costs linearly in the number of links
+(times the depth of the mount chains). The normal matrix is then solved densely with NumPy, which stays faster than
+a sparse factorization up to several hundred links; from sparse_threshold unknowns on it is kept sparse with scipy,
+if it is installed.
+'''
+from math import pi
+import numpy as np
+
+def _sparse():
+    '''scipy.sparse and spsolve, or None without scipy'''
+    try:
+        from scipy import sparse
+        from scipy.sparse.linalg import spsolve
+    except ImportError:
+        return None
+    return sparse, spsolve
+
+class LoopClosure():
+    '''The loop-closure constraints of a Murphy, solved by damped Newton steps from its current pose'''
+    max_iterations = 50
+    tolerance = 1e-12 # ikea_error at which the loops count as closed
+    damping = 1e-3
+    sparse_threshold = 1000
+
+    def __init__(self, murphy):
+        self.murphy = murphy
+        links = murphy.links
+        index = {id(link): i for i, link in enumerate(links)}
+        # the links whose angles move the pivot of each link, nearest mount first
+        self.chains = []
+        for link in links:
+            chain, mount = [], link.mount
+            while mount is not None:
+                chain.append(index[id(mount)])
+                mount = mount.mount
+            self.chains.append(chain)
+        # (link, link its attachment is on or None for the bedframe) for every loop
+        self.loops = [(i, None if link.attached_to is None else index[id(link.attached_to)])
+                      for i, link in enumerate(links) if link.attachment is not None]
+        self.shape = (2*len(self.loops), 2 + len(links))
+
+    def evaluate(self):
+        '''The gaps r at the current pose of the Murphy, and the Jacobian of r with respect to its state (bedframe
+        x, y and the link angles in degrees) as COO triplets'''
+        murphy = self.murphy
+        murphy.place()
+        links = murphy.links
+        # d(distal)/d(angle) of every link, the distal end turned a quarter turn about the pivot
+        turns = []
+        for link in links:
+            X, Y = link.distal
+            turns.append(((link.y - Y)*pi/180, (X - link.x)*pi/180))
+        r = np.zeros(self.shape[0])
+        rows, columns, values = [], [], []
+
+        def add(row, column, derivative, sign = 1):
+            rows.extend((row, row + 1))
+            columns.extend((column, column))
+            values.extend((sign*derivative[0], sign*derivative[1]))
+
+        for k, (i, body) in enumerate(self.loops):
+            link, row = links[i], 2*k
+            attachment = link.room_attachment
+            X, Y = link.distal
+            r[row], r[row + 1] = X - attachment['x'], Y - attachment['y']
+            for j in [i] + self.chains[i]:
+                add(row, 2 + j, turns[j])
+            if body is None:
+                add(row, 0, (1, 0), -1)
+                add(row, 1, (0, 1), -1)
+            else:
+                # the attachment point turns with the link it is on, and moves with that link's mounts
+                target = links[body]
+                add(row, 2 + body, ((target.y - attachment['y'])*pi/180, (attachment['x'] - target.x)*pi/180), -1)
+                for j in self.chains[body]:
+                    add(row, 2 + j, turns[j], -1)
+        return r, (np.array(rows), np.array(columns), np.array(values))
+
+    def _step(self, r, triplets, damping):
+        rows, columns, values = triplets
+        n = self.shape[1]
+        sparse = _sparse() if n >= self.sparse_threshold else None
+        if sparse is None:
+            J = np.zeros(self.shape)
+            np.add.at(J, (rows, columns), values)
+            normal = J.T @ J
+            normal[np.diag_indices(n)] += damping*np.diag(normal) + 1e-12
+            return np.linalg.solve(normal, -J.T @ r)
+        sparse, spsolve = sparse
+        J = sparse.coo_matrix((values, (rows, columns)), shape = self.shape).tocsr()
+        normal = J.T @ J
+        normal = normal + sparse.diags(damping*normal.diagonal() + 1e-12)
+        return spsolve(normal.tocsc(), -(J.T @ r))
+
+    def solve(self):
+        '''Move the Murphy to the closest pose that closes every loop, starting from its current pose.
+        Returns the number of iterations taken.'''
+        murphy = self.murphy
+        r, triplets = self.evaluate()
+        cost = r @ r
+        damping = self.damping
+        for iteration in range(1, self.max_iterations + 1):
+            if cost < self.tolerance:
+                break
+            state = np.array(murphy.state)
+            try:
+                step = self._step(r, triplets, damping)
+            except np.linalg.LinAlgError:
+                step = None
+            if step is not None and np.all(np.isfinite(step)):
+                murphy.state = tuple((state + step).tolist())
+                trial, trial_triplets = self.evaluate()
+                if trial @ trial < cost:
+                    r, triplets, cost = trial, trial_triplets, trial @ trial
+                    damping = max(damping/10, 1e-9)
+                    continue
+                murphy.state = tuple(state.tolist())
+            # a rejected step: lean towards gradient descent, until the steps are too short to matter
+            damping *= 10
+            if damping > 1e8:
+                break
+        murphy.place()
+        return iteration
@@ -0,0 +1,61 @@
+import numpy as np
+
+class Design():
+    '''The design variables of a Murphy (link pivots, lengths and attachment points) as a flat vector.
+    names[i] says where values[i] lives, e.g. 'A.x' is A_link.x and 'B.attachment.y' is B_link.attachment['y'].
+    variables lists the variables of each label; by default every link has all of link_variables.'''
+    link_variables = ['x', 'y', 'length', 'attachment.x', 'attachment.y']
+
+    def __init__(self, values, labels = ('A', 'B'), variables = None):
+        self.labels = tuple(labels)
+        self.variables = {label: list(self.link_variables) for label in self.labels}
+        self.variables.update(variables or {})
+        self.values = np.array(values, dtype = float)
+        if len(self.values) != len(self.names):
+            raise ValueError('Expected {} design values, got {}'.format(len(self.names), len(self.values)))
+
+    @property
+    def names(self):
+        return ['{}.{}'.format(label, variable) for label in self.labels for variable in self.variables[label]]
+
+    @classmethod
+    def link_variables_of(cls, link):
+        '''The design variables of a link: the pivot of a mounted link follows its mount, and a link without an
+        attachment has no attachment point'''
+        return [variable for variable in cls.link_variables
+                if not (link.mount is not None and variable in ('x', 'y') or link.attachment is None and variable.startswith('attachment.'))]
+
+    @classmethod
+    def from_murphy(cls, murphy):
+        labels = murphy.labels
+        variables = {label: cls.link_variables_of(link) for label, link in zip(labels, murphy.links)}
+        design = cls(np.zeros(sum(len(v) for v in variables.values())), labels, variables)
+        design.values[:] = [design._get(murphy, name) for name in design.names]
+        return design
+
+    def with_values(self, values):
+        '''A design with the same variables and new values'''
+        return Design(values, self.labels, self.variables)
+
+    def apply(self, murphy):
+        '''Set the design variables of murphy to these values, returning murphy'''
+        for name, value in zip(self.names, self.values):
+            label, variable = name.split('.', 1)
+            link = getattr(murphy, label)
+            if variable.startswith('attachment.'):
+                link.attachment[variable.split('.')[1]] = float(value)
+            else:
+                setattr(link, variable, float(value))
+        murphy.place()
+        return murphy
+
+    @staticmethod
+    def _get(murphy, name):
+        label, variable = name.split('.', 1)
+        link = getattr(murphy, label)
+        if variable.startswith('attachment.'):
+            return link.attachment[variable.split('.')[1]]
+        return getattr(link, variable)
+
+    def __repr__(self):
+        return 'Design({})'.format(', '.join('{}={:.3f}'.format(n, v) for n, v in zip(self.names, self.values)))
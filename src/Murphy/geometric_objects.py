@@ -1,4 +1,29 @@
+import numpy as np
+
+def point_segment_distance(p, a, b):
+    '''Distance from points p to segments a-b, all arrays with x and y along the last axis'''
+    d = b - a
+    length2 = (d*d).sum(axis=-1)
+    t = ((p - a)*d).sum(axis=-1)/np.where(length2 > 0, length2, 1)
+    t = np.clip(t, 0, 1)[..., None]
+    return np.linalg.norm(p - a - t*d, axis=-1)
+
+def _cross(o, a, b):
+    return (a[..., 0] - o[..., 0])*(b[..., 1] - o[..., 1]) - (a[..., 1] - o[..., 1])*(b[..., 0] - o[..., 0])
+
+def segment_distance(a0, a1, b0, b1):
+    '''Distance between segments a0-a1 and b0-b1, 0 where they cross'''
+    distance = point_segment_distance(np.stack([a0, a1, b0, b1]), np.stack([b0, b0, a0, a0]), np.stack([b1, b1, a1, a1])).min(axis=0)
+    crossing = (_cross(a0, a1, b0)*_cross(a0, a1, b1) < 0) & (_cross(b0, b1, a0)*_cross(b0, b1, a1) < 0)
+    return np.where(crossing, 0, distance)
+
+def _rotation(angle):
+    theta = np.radians(angle)
+    c, s = np.cos(theta), np.sin(theta)
+    return np.array([[c, s], [-s, c]]) # transposed, for row vectors
+
 class Point:
+    __slots__ = ('x', 'y')
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -16,8 +41,8 @@ class Point:
 
     def _distance_to_line(self, line):
         x,y = self.x, self.y
-        x1, y1 = line.point1.x, line.point1.y
-        x2, y2 = line.point2.x, line.point2.y
+        x1, y1 = line.p0.x, line.p0.y
+        x2, y2 = line.p1.x, line.p1.y
 
         numerator = abs((y2-y1)*x-(x2-x1)*y + x2*y1 - y2*x1)
         denominator = ((y2-y1)**2 + (x2-x1)**2)**.5
@@ -55,11 +80,11 @@ class Point:
 
 
 class LineSegment:
+    __slots__ = ('p0', 'p1')
     def __init__(self, p0, p1):
-        points = list(set([p0, p1]))
-
-        self.p0 = points[0]
-        self.p1 = points[1]
+        # endpoints are kept in the order given
+        self.p0 = p0
+        self.p1 = p1
 
     @property
     def length(self):
@@ -79,11 +104,128 @@ class LineSegment:
         return LineSegment(p0, p1)
 
     def __iadd__(self, point):
+        # new endpoints, so segments sharing a Point with this one do not move too
         self.p0, self.p1 = self.p0 + point, self.p1 + point
-    
+        return self
+
     def __isub__(self, point):
         self.p0, self.p1 = self.p0 - point, self.p1 - point
+        return self
 
     def __repr__(self):
         return f'({self.p0})<-->({self.p1})'
 
+
+class PointArray:
+    '''Any number of points, held as one array with x and y along the last axis.
+    Unpacks like the (x, y) tuples used elsewhere: x, y = points.'''
+    __slots__ = ('xy', '_buffer')
+    def __init__(self, x, y = None):
+        if y is None:
+            self.xy = np.array(x, dtype = float)
+        elif np.shape(x) == np.shape(y):
+            self.xy = np.stack((x, y), axis = -1).astype(float, copy = False)
+        else:
+            self.xy = np.stack(np.broadcast_arrays(x, y), axis = -1).astype(float, copy = False)
+        self._buffer = None
+
+    @property
+    def x(self):
+        return self.xy[..., 0]
+
+    @property
+    def y(self):
+        return self.xy[..., 1]
+
+    @property
+    def shape(self):
+        return self.xy.shape[:-1]
+
+    def __iter__(self):
+        return iter((self.x, self.y))
+
+    def take(self, index):
+        '''The points at index, as a new PointArray'''
+        return PointArray(self.xy[index])
+
+    def distance(self, other):
+        if isinstance(other, PointArray):
+            return np.linalg.norm(self.xy - other.xy, axis=-1)
+        elif isinstance(other, SegmentArray):
+            return point_segment_distance(self.xy, other.p0.xy, other.p1.xy)
+        else:
+            raise TypeError(other)
+
+    def translate(self, dx, dy):
+        '''Move every point by (dx, dy), in place'''
+        self.xy[..., 0] += dx
+        self.xy[..., 1] += dy
+        return self
+
+    def rotate(self, angle, origin = (0, 0)):
+        '''Rotate every point by angle (degrees, counterclockwise) about origin, in place. The result is written
+        to a buffer kept from the last rotation, so repeated rotations do not allocate; views of x and y taken
+        before a rotation are left stale.'''
+        if self._buffer is None or self._buffer.shape != self.xy.shape:
+            self._buffer = np.empty_like(self.xy)
+        self.translate(-origin[0], -origin[1])
+        np.matmul(self.xy, _rotation(angle), out = self._buffer)
+        self.xy, self._buffer = self._buffer, self.xy
+        return self.translate(origin[0], origin[1])
+
+    def __add__(self, other):
+        return PointArray(self.xy + other.xy)
+
+    def __sub__(self, other):
+        return PointArray(self.xy - other.xy)
+
+    def __iadd__(self, other):
+        self.xy += other.xy
+        return self
+
+    def __isub__(self, other):
+        self.xy -= other.xy
+        return self
+
+    def __repr__(self):
+        return f'PointArray({self.xy.tolist()})'
+
+
+class SegmentArray:
+    '''Any number of line segments from p0 to p1, both PointArrays of the same shape.
+    Unpacks like the (p0, p1) tuples used elsewhere: p0, p1 = segments.'''
+    __slots__ = ('p0', 'p1')
+    def __init__(self, p0, p1):
+        self.p0 = p0
+        self.p1 = p1
+
+    @property
+    def length(self):
+        return self.p0.distance(self.p1)
+
+    def __iter__(self):
+        return iter((self.p0, self.p1))
+
+    def take(self, index):
+        return SegmentArray(self.p0.take(index), self.p1.take(index))
+
+    def distance(self, other):
+        if isinstance(other, PointArray):
+            return other.distance(self)
+        elif isinstance(other, SegmentArray):
+            return segment_distance(self.p0.xy, self.p1.xy, other.p0.xy, other.p1.xy)
+        else:
+            raise TypeError(other)
+
+    def translate(self, dx, dy):
+        self.p0.translate(dx, dy)
+        self.p1.translate(dx, dy)
+        return self
+
+    def rotate(self, angle, origin = (0, 0)):
+        self.p0.rotate(angle, origin)
+        self.p1.rotate(angle, origin)
+        return self
+
+    def __repr__(self):
+        return f'SegmentArray({self.p0!r}, {self.p1!r})'
@@ -0,0 +1,172 @@
+'''Batch kinematics for Bedframe and Link.
+
+Every function takes scalars or NumPy arrays for the bed angle and the design parameters and broadcasts them
+against each other, so a full sweep of angles over many candidate designs is a handful of array operations:
+
+    angles = np.linspace(0, 90, 91)[:, None]      # one row per angle
+    lengths = np.array([70, 72, 74])[None, :]     # one column per design
+    geometry = bedframe_geometry(0, 0, 10, lengths, 12, angles)
+    geometry['upper_foot'].x.shape                # (91, 3)
+
+Points are returned as PointArrays and line segments as SegmentArrays (see Murphy.geometric_objects), which
+unpack like (x, y) and (p0, p1) tuples. Angles are in degrees, as everywhere else in Murphy.
+'''
+import numpy as np
+from Murphy.geometric_objects import PointArray, SegmentArray
+
+def bedframe_corners(x, y, thickness, length, angle):
+    '''The four corners of the bedframe. lower_head is the bedframe origin (x, y).'''
+    x, y, thickness, length, theta = np.broadcast_arrays(x, y, thickness, length, np.radians(angle))
+    c, s = np.cos(theta), np.sin(theta)
+    x, y = x.astype(float), y.astype(float)
+    return {'lower_head': PointArray(x, y),
+            'lower_foot': PointArray(x + length*c, y + length*s),
+            'upper_foot': PointArray(x + length*c - thickness*s, y + length*s + thickness*c),
+            'upper_head': PointArray(x - thickness*s, y + thickness*c)}
+
+def offset_point(p, p1, p2, offset):
+    '''The point offset from corner p by a distance offset along each of the edges towards p1 and p2'''
+    x, y = p
+    x1, y1 = p1
+    x2, y2 = p2
+    d1 = np.hypot(x1-x, y1-y)/offset
+    d2 = np.hypot(x2-x, y2-y)/offset
+    return PointArray(x + (x1-x)/d1 + (x2-x)/d2, y + (y1-y)/d1 + (y2-y)/d2)
+
+def bedframe_geometry(x, y, thickness, length, margin, angle):
+    '''Corners, margin points, bounding box and floor opening of the bedframe'''
+    geometry = bedframe_corners(x, y, thickness, length, angle)
+    lower_head, lower_foot = geometry['lower_head'], geometry['lower_foot']
+    upper_head, upper_foot = geometry['upper_head'], geometry['upper_foot']
+
+    geometry['head_lower_margin'] = offset_point(lower_head, lower_foot, upper_head, margin)
+    geometry['head_upper_margin'] = offset_point(upper_head, lower_head, upper_foot, margin)
+    geometry['foot_lower_margin'] = offset_point(lower_foot, upper_foot, lower_head, margin)
+    geometry['foot_upper_margin'] = offset_point(upper_foot, upper_head, lower_foot, margin)
+
+    corners = np.stack([lower_foot.xy, lower_head.xy, upper_foot.xy, upper_head.xy])
+    low, high = corners.min(axis=0), corners.max(axis=0)
+    geometry['left_edge'], geometry['right_edge'] = low[..., 0], high[..., 0]
+    geometry['bottom'], geometry['top'] = low[..., 1], high[..., 1]
+    geometry['extents'] = {'left': geometry['left_edge'], 'right': geometry['right_edge'],
+                           'top': geometry['top'], 'bottom': geometry['bottom']}
+
+    # Floor opening: the furthest point along the floor (y = 0) covered by the bedframe, from the edges that cross it
+    corners = [lower_head, lower_foot, upper_foot, upper_head]
+    floor_opening = 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for (x0, y0), (x1, y1) in zip(corners, corners[1:] + corners[:1]):
+            floor_opening = np.maximum(floor_opening, np.where(y0*y1 < 0, x0 - y0*(x1-x0)/(y1-y0), 0))
+    geometry['floor_opening'] = floor_opening
+    return geometry
+
+def link_distal(x, y, length, angle):
+    '''The free end of a link pivoting about (x, y)'''
+    theta = np.radians(angle)
+    return PointArray(x + length*np.cos(theta), y + length*np.sin(theta))
+
+def link_geometry(x, y, length, width, angle):
+    '''Distal point, edges, extents and floor opening of a link'''
+    theta = np.radians(angle)
+    c, s = np.cos(theta), np.sin(theta)
+    x, y, length, width, c, s = np.broadcast_arrays(x, y, length, width, c, s)
+    X, Y = x + length*c, y + length*s
+    w = r = width/2
+
+    edges = [SegmentArray(PointArray(x - w*s, y + w*c), PointArray(X - w*s, Y + w*c)),
+             SegmentArray(PointArray(x + w*s, y - w*c), PointArray(X + w*s, Y - w*c))]
+
+    extents = {'left': np.minimum(x, X) - w,
+               'right': np.maximum(x, X) + w,
+               'top': np.maximum(y, Y) + w,
+               'bottom': np.minimum(y, Y) - w}
+
+    # Floor opening: the furthest point along the floor (y = 0) that the link covers, from either end cap or the body
+    with np.errstate(divide='ignore', invalid='ignore'):
+        a0 = np.where(np.abs(y) < r, x + np.sqrt(np.maximum(r**2 - y**2, 0)), 0)
+        a1 = np.where(np.abs(Y) < r, X + np.sqrt(np.maximum(r**2 - Y**2, 0)), 0)
+        a2 = np.where(y*Y < 0, x - y*(X-x)/(Y-y) + np.abs(w/s), 0)
+    floor_opening = np.maximum(np.maximum(a0, a1), a2)
+
+    return {'distal': PointArray(X, Y), 'edges': edges, 'extents': extents, 'floor_opening': floor_opening}
+
+def attachment_offset(x, y):
+    '''The attachment point (x, y) in bedframe coordinates as Link.room_attachment uses it, through its polar form'''
+    l = np.hypot(x, y)
+    phi = np.arctan(y/x)
+    return l*np.cos(phi), l*np.sin(phi)
+
+def assemble_four_bar(angle, A, B, reference = None):
+    '''The pose of the four-bar linkage at bed angle, as Murphy._assemble_analytic finds it, for arrays of designs.
+    A and B are (x, y, length, u, v): pivot, length and attachment_offset of each link. reference is a point near
+    A's distal end, (X, Y), that picks the branch of the linkage; without one the first intersection is taken.
+    Returns the bedframe origin x, y, the link angles (degrees, in (-180, 180]), whether the linkage closes, and
+    the residual ikea_error of the closest pose where it does not.'''
+    theta = np.radians(angle)
+    c, s = np.cos(theta), np.sin(theta)
+    (Ax, Ay, r0, Au, Av), (Bx, By, r1, Bu, Bv) = A, B
+    ax, ay = Au*c - Av*s, Au*s + Av*c
+    bx, by = Bu*c - Bv*s, Bu*s + Bv*c
+
+    # centre of the shifted B circle and its distance from A's pivot
+    dx, dy = Bx - (bx - ax) - Ax, By - (by - ay) - Ay
+    d = np.hypot(dx, dy)
+    assembled = (d > 0) & (d <= r0 + r1) & (d >= np.abs(r0 - r1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ux, uy = np.where(d > 0, dx/d, 1), np.where(d > 0, dy/d, 0)
+        along = (r0**2 - r1**2 + d**2)/(2*d)
+    h = np.sqrt(np.maximum(r0**2 - along**2, 0))
+    mx, my = Ax + along*ux, Ay + along*uy
+    px, py = mx - h*uy, my + h*ux
+    if reference is not None:
+        # keep the branch of the linkage closest to the reference
+        X, Y = reference
+        qx, qy = mx + h*uy, my - h*ux
+        other = (qx - X)**2 + (qy - Y)**2 < (px - X)**2 + (py - Y)**2
+        px, py = np.where(other, qx, px), np.where(other, qy, py)
+    # where there is no pose, the point on A's circle nearest B's circle
+    sign = np.where(r1 > r0 + d, -1, 1)
+    px, py = np.where(assembled, px, Ax + sign*r0*ux), np.where(assembled, py, Ay + sign*r0*uy)
+
+    qx, qy = px + (bx - ax), py + (by - ay)
+    B_angle = np.degrees(np.arctan2(qy - By, qx - Bx))
+    gx = Bx + r1*np.cos(np.radians(B_angle)) - qx
+    gy = By + r1*np.sin(np.radians(B_angle)) - qy
+    gx, gy = np.where(assembled, 0, gx), np.where(assembled, 0, gy)
+    # the bedframe is moved halfway across the gap, leaving half of it at each link
+    return {'x': px - ax + gx/2, 'y': py - ay + gy/2,
+            'A_angle': np.degrees(np.arctan2(py - Ay, px - Ax)), 'B_angle': B_angle,
+            'assembled': assembled, 'residual': (gx**2 + gy**2)/2}
+
+def sweep_geometry(design, states):
+    '''Bedframe and link geometry of design (a Murphy) at rows of solved states (see SolutionStore.states), as
+    [bedframe, link, ...] in the order of design.links. Each link also has its 'pivot', which follows the distal end
+    of its mount for a mounted link, and its 'attachment' point in room coordinates (None without one).'''
+    bedframe = design.bedframe
+    components = [bedframe_geometry(states['x'], states['y'], bedframe.t, bedframe.l, bedframe.margin, states['angle'])]
+    index = {id(link): i for i, link in enumerate(design.links)}
+    shape = np.shape(states)
+    for label, link in zip(design.labels, design.links):
+        if link.mount is None:
+            x, y = np.broadcast_to(float(link.x), shape), np.broadcast_to(float(link.y), shape)
+        else:
+            x, y = components[1 + index[id(link.mount)]]['distal']
+        geometry = link_geometry(x, y, link.length, link.width, states[label + '_angle'])
+        geometry['pivot'] = PointArray(x, y)
+        components.append(geometry)
+
+    # attachment points, on the bedframe (at its origin and angle) or on a link (at its pivot and angle)
+    for label, link, geometry in zip(design.labels, design.links, components[1:]):
+        if link.attachment is None:
+            geometry['attachment'] = None
+            continue
+        if link.attached_to is None:
+            (x, y), angle = components[0]['lower_head'], states['angle']
+        else:
+            i = index[id(link.attached_to)]
+            (x, y), angle = components[1 + i]['pivot'], states[design.labels[i] + '_angle']
+        u, v = attachment_offset(link.attachment['x'], link.attachment['y'])
+        theta = np.radians(angle)
+        c, s = np.cos(theta), np.sin(theta)
+        geometry['attachment'] = PointArray(x + u*c - v*s, y + u*s + v*c)
+    return components
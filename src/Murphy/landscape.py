@@ -0,0 +1,170 @@
+'''murphy_error and its terms over a grid of design variables.
+
+    landscape = Landscape(murphy_bed, {'A.x': np.linspace(-2, 2, 41), 'B.length': (8, 12, 41)}, 'landscape.npy')
+    landscape.run(processes = 8)
+    landscape.error              # (41, 41) totals
+    landscape.terms[..., 7]      # (41, 41) weighted floor opening terms
+
+Every other design variable keeps its value in murphy_bed. Results go straight into a .npy file opened as a
+memory map by every worker, one row of (total, terms...) per grid cell, so nothing is pickled back. A cell that
+has not been computed yet holds NaN, which makes an interrupted grid resumable: running it again, with the same
+path and axes, computes only the missing cells. A cell that could not be solved gets an infinite total.
+
+The cells are visited in snake order, each axis running back and forth as the ones before it advance, so
+consecutive cells are always neighbours. Workers take contiguous chunks of that order, and each cell starts its
+sweep from the deployed pose of the cell before it, which keeps neighbouring cells on the same branch of the
+linkage. The deployed poses are kept next to the results (path with .states.npy), so resumed chunks start warm too.
+'''
+import json
+import os
+from multiprocessing import Pool
+import numpy as np
+from Murphy.design import Design
+from Murphy.murphy_bed import MurphyBed
+
+def snake_order(shape):
+    '''Flat (C order) indices of a grid of shape, in the order that reverses each axis whenever the coordinates
+    before it sum to an odd number, so every step moves to a neighbouring cell'''
+    digits = np.indices(shape).reshape(len(shape), -1)
+    coordinates = digits.copy()
+    for k in range(1, len(shape)):
+        odd = coordinates[:k].sum(axis = 0) % 2 == 1
+        coordinates[k] = np.where(odd, shape[k] - 1 - digits[k], digits[k])
+    return np.ravel_multi_index(coordinates, shape)
+
+# The landscape a worker process is computing, set once per process by _start_worker
+_worker = None
+
+def _start_worker(landscape):
+    global _worker
+    _worker = landscape
+    landscape.open()
+
+def _run_chunk(cells):
+    '''Compute the missing cells of a chunk (flat indices, in order) in the worker's landscape. Returns how many
+    were computed; the results themselves are written to the memory map.'''
+    return _worker.compute(cells)
+
+class Landscape():
+    '''murphy_error over the grid spanned by axes ({design variable: values or (start, stop, num)}), kept in path'''
+    chunk = 32 # cells per piece of work handed to a worker
+
+    def __init__(self, murphy_bed, axes, path, angle_steps = 5):
+        self.template = murphy_bed.deployed_template()
+        self.design = Design.from_murphy(self.template)
+        self.names = list(axes)
+        unknown = [name for name in self.names if name not in self.design.names]
+        if unknown:
+            raise ValueError('{} not design variables, expected some of {}'.format(', '.join(unknown), ', '.join(self.design.names)))
+        self.axes = [np.linspace(*values) if isinstance(values, tuple) else np.asarray(values, dtype = float) for values in axes.values()]
+        self.shape = tuple(len(values) for values in self.axes)
+        self.heights = murphy_bed.desired_deployed_height, murphy_bed.desired_stowed_height
+        self.angle_steps = angle_steps
+        self.path = path
+        self.columns = 1 + len(MurphyBed.balance) # the total, then the weighted terms
+        self._create()
+        self.open()
+
+    @property
+    def _states_path(self):
+        return os.path.splitext(self.path)[0] + '.states.npy'
+
+    @property
+    def _axes_path(self):
+        return os.path.splitext(self.path)[0] + '.axes.json'
+
+    def _create(self):
+        '''Create the result files filled with NaN, or check that existing ones belong to this grid'''
+        header = {'names': self.names, 'axes': [values.tolist() for values in self.axes], 'angle_steps': self.angle_steps,
+                  'design': self.design.values.tolist(), 'heights': list(self.heights)}
+        if os.path.exists(self.path):
+            with open(self._axes_path) as f:
+                if json.load(f) != header:
+                    raise ValueError('{} holds a different grid; remove it or use another path'.format(self.path))
+            return
+        with open(self._axes_path, 'w') as f:
+            json.dump(header, f)
+        for path, columns in [(self._states_path, len(self.template.state)), (self.path, self.columns)]:
+            array = np.lib.format.open_memmap(path, mode = 'w+', dtype = float, shape = self.shape + (columns,))
+            array[:] = np.nan
+            array.flush()
+            del array
+
+    def open(self):
+        '''Map the result files, shared with every other process that has them open'''
+        self.results = np.load(self.path, mmap_mode = 'r+')
+        self.states = np.load(self._states_path, mmap_mode = 'r+')
+        return self
+
+    def __getstate__(self):
+        # the memory maps are opened again in each worker rather than pickled
+        state = self.__dict__.copy()
+        state['results'] = state['states'] = None
+        return state
+
+    def bed(self, cell):
+        '''The Murphy of a grid cell (flat index)'''
+        values = self.design.values.copy()
+        for name, axis, i in zip(self.names, self.axes, np.unravel_index(cell, self.shape)):
+            values[self.design.names.index(name)] = axis[i]
+        return self.design.with_values(values).apply(self.template.copy())
+
+    def compute(self, cells):
+        '''Solve the cells (flat indices) that are still missing, in order, each starting from the deployed pose of
+        the one before'''
+        results = self.results.reshape(-1, self.columns)
+        states = self.states.reshape(-1, self.states.shape[-1])
+        warm, computed = None, 0
+        for cell in cells:
+            if not np.isnan(results[cell, 0]):
+                if np.isfinite(results[cell, 0]):
+                    warm = tuple(states[cell].tolist())
+                continue
+            bed = self.bed(cell)
+            if warm is not None:
+                bed.state = warm
+            try:
+                murphy_bed = MurphyBed(bed, *self.heights)
+                murphy_bed.solve_over_full_range(self.angle_steps)
+                error, terms = murphy_bed.murphy_error
+                warm = tuple(murphy_bed.collected_solutions.states[0][murphy_bed.collected_solutions.state_fields].tolist())
+            except Exception:
+                error, terms, warm = np.inf, np.full(self.columns - 1, np.nan), None
+            states[cell] = warm if warm is not None else np.nan
+            results[cell, 1:] = terms
+            # the total goes last, as it marks the cell done
+            results[cell, 0] = error
+            computed += 1
+        self.results.flush()
+        self.states.flush()
+        return computed
+
+    def chunks(self):
+        '''Contiguous pieces of the snake order that still have missing cells'''
+        order = snake_order(self.shape)
+        missing = np.isnan(self.results.reshape(-1, self.columns)[:, 0])
+        return [piece for piece in (order[i:i + self.chunk] for i in range(0, len(order), self.chunk)) if missing[piece].any()]
+
+    def run(self, processes = None):
+        '''Compute every missing cell on processes workers (1 computes them here). Returns the number computed.'''
+        chunks = self.chunks()
+        if processes == 1:
+            return sum(self.compute(chunk) for chunk in chunks)
+        with Pool(processes, initializer = _start_worker, initargs = (self,)) as pool:
+            computed = sum(pool.imap_unordered(_run_chunk, chunks))
+        return computed
+
+    @property
+    def done(self):
+        '''Which cells have been computed'''
+        return ~np.isnan(self.results[..., 0])
+
+    @property
+    def error(self):
+        '''murphy_error of every cell, NaN where not computed yet'''
+        return self.results[..., 0]
+
+    @property
+    def terms(self):
+        '''The weighted terms of murphy_error of every cell, along the last axis'''
+        return self.results[..., 1:]
@@ -1,80 +1,86 @@
 
 from math import sin, cos, radians, atan
-import numpy as np
-import matplotlib.pyplot as plt
 
 class Link():
-    def __init__(self, x, y, length, width, angle, color, bedframe, attachment = None):
+    # Single-pose geometry is plain math on the cached trig; kinematics.link_geometry is the batch version
+    __slots__ = ('x', 'y', 'length', 'width', 'angle', 'color', 'bedframe', 'attachment', 'mount', 'attached_to',
+                 '_trig', '_attachment_offset')
+
+    def __init__(self, x, y, length, width, angle, color, bedframe, attachment = None, mount = None, attached_to = None):
         self.x, self.y = x, y
         self.length, self.width = length, width
         self.angle = angle
         self.color = color
         self.bedframe = bedframe
-        # Attachment point relative to the bedframe
-        self.attachment = {'x':attachment[0],'y':attachment[1]}
+        # Attachment point relative to the bedframe, or to the link attached_to (x along it from its pivot, y across).
+        # A link without one only carries other links.
+        self.attachment = {'x':attachment[0],'y':attachment[1]} if attachment is not None else None
+        self.attached_to = attached_to
+        # A link mounted on another pivots about that link's distal end; the Murphy keeps x, y there
+        self.mount = mount
+        self._attachment_offset = (None, None)
+        self._trig = None, None
+
+    @property
+    def trig(self):
+        '''cos and sin of the link angle, kept until the angle changes'''
+        angle = self.angle
+        if self._trig[0] != angle:
+            theta = radians(angle)
+            self._trig = angle, (cos(theta), sin(theta))
+        return self._trig[1]
+
+    @property
+    def body(self):
+        '''The part the attachment point is fixed to'''
+        return self.bedframe if self.attached_to is None else self.attached_to
 
     @property
     def room_attachment(self):
         # attachment point relative to the room
-        if self.attachment:
-            theta = radians(self.bedframe.angle)
-            l = ((self.attachment['x']**2)+(self.attachment['y']**2))**0.5
-            phi = atan(self.attachment['y']/self.attachment['x'])
-            x = self.bedframe.x + l*cos(theta + phi)
-            y = self.bedframe.y + l*sin(theta + phi)    
+        if self.attachment is not None:
+            # the polar form of the attachment only changes with the attachment itself
+            key = (self.attachment['x'], self.attachment['y'])
+            if self._attachment_offset[0] != key:
+                l = ((self.attachment['x']**2)+(self.attachment['y']**2))**0.5
+                phi = atan(self.attachment['y']/self.attachment['x'])
+                self._attachment_offset = key, (l*cos(phi), l*sin(phi))
+            u, v = self._attachment_offset[1]
+            body = self.body
+            c, s = body.trig
+            x = body.x + u*c - v*s
+            y = body.y + u*s + v*c
             return {'x':x, 'y':y}
         else: return None
 
     @property
     def distal(self):
-        x, y, l, theta = self.x, self.y, self.length, radians(self.angle)
-        X = x + l * cos(theta)
-        Y = y + l * sin(theta) 
-        return X,Y
+        c, s = self.trig
+        return self.x + self.length*c, self.y + self.length*s
 
     @property
     def edges(self):
-        x,y,w, theta = self.x, self.y, self.width/2, radians(self.angle)
-        X,Y = self.distal
-        x0 = x - w*sin(theta)
-        x1 = X - w*sin(theta)
-        y0 = y + w*cos(theta)
-        y1 = Y + w*cos(theta)
-
-        X0 = x + w*sin(theta)
-        X1 = X + w*sin(theta)
-        Y0 = y - w*cos(theta)
-        Y1 = Y - w*cos(theta)
-        return [((x0, y0), (x1, y1)), ((X0, Y0), (X1, Y1))]
+        x, y, w = self.x, self.y, self.width/2
+        X, Y = self.distal
+        c, s = self.trig
+        return [((x - w*s, y + w*c), (X - w*s, Y + w*c)), ((x + w*s, y - w*c), (X + w*s, Y - w*c))]
 
     @property
     def extents(self):
-        left = min(self.x, self.distal[0]) - self.width/2
-        right = max(self.x, self.distal[0]) + self.width/2
-        top = max(self.y, self.distal[1]) + self.width/2
-        bottom = min(self.y, self.distal[1]) - self.width/2
-        return {'left':left, 'right':right, 'top':top, 'bottom':bottom}
+        X, Y = self.distal
+        w = self.width/2
+        return {'left': min(self.x, X) - w, 'right': max(self.x, X) + w, 'top': max(self.y, Y) + w, 'bottom': min(self.y, Y) - w}
 
     @property
     def floor_opening(self):
         w = r = self.width/2
-        theta = radians(self.angle)
-        x,y = self.x, self.y
-        X,Y = self.distal
-
-        if abs(self.y) < r:
-            a0 = self.x + ((r**2)-(self.y)**2)**0.5
-        else:
-            a0 = 0
-        if abs(self.distal[1]) < w:
-            a1 = self.distal[0] + ((r**2)-self.distal[1]**2)**0.5
-        else:
-            a1 = 0
-        if y * Y < 0:
-            a2 = x - y*(X-x)/(Y-y) + abs(w/sin(theta))
-        else: a2 = 0
-
-        return max(a0,a1,a2)
+        x, y = self.x, self.y
+        X, Y = self.distal
+
+        a0 = x + (r**2 - y**2)**0.5 if abs(y) < r else 0
+        a1 = X + (r**2 - Y**2)**0.5 if abs(Y) < r else 0
+        a2 = x - y*(X-x)/(Y-y) + abs(w/self.trig[1]) if y*Y < 0 else 0
+        return max(a0, a1, a2)
 
     @property
     def CoG(self):
@@ -83,12 +89,14 @@ class Link():
     @property
     def ikea_error(self):
         '''Ikea error is the assembly error, or the distance from the distal point of a link to its intended attachment point'''
-        if self.attachment:
+        if self.attachment is not None:
             fit_error = ((self.distal[0]-self.room_attachment['x'])**2+(self.distal[1]-self.room_attachment['y'])**2)
         else: fit_error = 0 
         return fit_error
 
     def plot(self, ax = None):
+        import matplotlib.pyplot as plt
+        from Murphy.render import circle
         plot_here = False
         if not ax:
             ax = plt.figure().add_subplot(111)
@@ -100,8 +108,7 @@ class Link():
             ax.plot([edge[0][0],edge[1][0]], [edge[0][1], edge[1][1]], c = self.color)
 
         for x,y in zip([self.x,self.distal[0]], [self.y,self.distal[1]]):
-            phi = np.radians(np.linspace(0,360,37))
-            ax.plot(r*np.cos(phi)+x, r*np.sin(phi)+y, c = self.color )
+            ax.plot(r*circle[:, 0]+x, r*circle[:, 1]+y, c = self.color )
 
         # Extents Box
         ax.plot([self.extents['left'], self.extents['right'], self.extents['right'], self.extents['left'], self.extents['left']],
@@ -1,43 +1,223 @@
+from math import atan2, degrees, hypot
+from copy import copy
+from time import perf_counter
+from Murphy.design import Design
+from Murphy.telemetry import telemetry
+
 class Murphy():
-    '''The Murphy Object represents a bed assembly at a particular angle'''
+    '''The Murphy Object represents a bed assembly at a particular angle.
+    The links are A, B and any more, labelled C, D, ... in order. A link mounted on another (Link.mount) has to come
+    after it; its pivot is kept at the mount's distal end.'''
     learning_rate = -.2
     threshold = .001
-    def __init__(self, bedframe, A_link, B_link):
+    cache = None # a PoseCache shared by all assemblies, see assemble
+    def __init__(self, bedframe, A_link, B_link, *links):
         ''' Basic structure'''
         self.bedframe = bedframe
-        self.A = A_link
-        self.B = B_link
+        self.links = [A_link, B_link] + list(links)
+        self.labels = [chr(ord('A') + i) for i in range(len(self.links))]
+        for i, (label, link) in enumerate(zip(self.labels, self.links)):
+            if link.mount is not None and not any(link.mount is other for other in self.links[:i]):
+                raise ValueError('Link {} is mounted on a link that does not come before it'.format(label))
+            setattr(self, label, link)
+        # the structure of the linkage is fixed here, so assemble and place do not look it up every time
+        self._mounted = [link for link in self.links if link.mount is not None]
+        # True for the plain four-bar linkage that _assemble_analytic solves: two links, both from the room to the bedframe
+        self.four_bar = len(self.links) == 2 and all(link.mount is None and link.attached_to is None and link.attachment is not None for link in self.links)
+        self.place()
+
+    def place(self):
+        '''Move the pivot of every mounted link to the distal end of its mount'''
+        for link in self._mounted:
+            X, Y = link.mount.distal
+            if link.x != X or link.y != Y:
+                link.x, link.y = X, Y
 
     @property
     def ikea_error(self):
         '''The total difference between actual positions and intended positions for fixed, rigid components.'''
-        return sum([component.ikea_error for component in [self.A, self.B]])
+        self.place()
+        return sum([component.ikea_error for component in self.links])
+
+    @property
+    def state(self):
+        '''The variables adjusted by assemble: bedframe (x, y) and the link angles'''
+        return (self.bedframe.x, self.bedframe.y, *[link.angle for link in self.links])
+
+    @state.setter
+    def state(self, state):
+        self.bedframe.x, self.bedframe.y = state[0], state[1]
+        for link, angle in zip(self.links, state[2:]):
+            link.angle = angle
+        self.place()
+
+    def copy(self):
+        '''A new Murphy with the same design and pose, without deep-copying the whole object graph'''
+        bedframe = copy(self.bedframe)
+        links = [copy(link) for link in self.links]
+        index = {id(link): i for i, link in enumerate(self.links)}
+        for link in links:
+            link.bedframe = bedframe
+            if link.attachment is not None:
+                link.attachment = dict(link.attachment)
+            if link.mount is not None:
+                link.mount = links[index[id(link.mount)]]
+            if link.attached_to is not None:
+                link.attached_to = links[index[id(link.attached_to)]]
+        return Murphy(bedframe, *links)
 
     def plot(self):
+        # plotting is optional, so matplotlib is only imported here
+        import matplotlib.pyplot as plt
         ax = plt.figure().add_subplot(111)
         ax.set_aspect('equal')
-        for component in [self.bedframe, self.A, self.B]:
+        for component in [self.bedframe] + self.links:
             ax = component.plot(ax)
         ax.set_title(round(self.ikea_error,2))
         plt.show()
 
-    def assemble(self, plot_here = False):
-        ''' For a given structure and bed angle, adjust link angles and bed (x,y) to minimize ikea error.'''
+    def assemble(self, plot_here = False, method = 'analytic'):
+        ''' For a given structure and bed angle, adjust link angles and bed (x,y) to minimize ikea error.
+        method = 'analytic' solves the four-bar linkage exactly, and falls back to 'newton' for any other linkage.
+        'newton' solves the loop-closure constraints of all links at once (see Murphy.constraints), 'iterative'
+        uses coordinate descent.
+        Returns True if an exact (or within threshold) pose was found. The number of iterations and of ikea_error
+        evaluations used are kept in self.iterations and self.ikea_evaluations, and reported to telemetry when it is enabled.
+        If Murphy.cache is set, a 'newton' or 'iterative' assembly of a design already assembled at this angle, on the
+        same branch (see branch), reuses its pose, and a nearby design in the same cache quantum starts from that pose
+        instead of the current one. The analytic four-bar solve is cheaper than a lookup and is never cached.'''
+        if not telemetry.enabled:
+            return self._assemble(plot_here, method)
+        start = perf_counter()
+        assembled = self._assemble(plot_here, method)
+        telemetry.emit('assemble', angle = self.bedframe.angle, method = method, assembled = assembled,
+                       failed = int(not assembled), iterations = self.iterations, ikea_evaluations = self.ikea_evaluations,
+                       residual = self.ikea_error, seconds = perf_counter() - start)
+        return assembled
+
+    @property
+    def branch(self):
+        '''Which of the two poses of the four-bar linkage at this bed angle the current pose is nearer, 1 or -1:
+        the side of A's distal end from the line through A's pivot and the centre of the shifted B circle (see
+        _assemble_analytic). The two poses are mirror images across that line, and the solvers keep to the side
+        they start from.'''
+        A, B = self.A, self.B
+        if A.attachment is None or B.attachment is None:
+            return 0
+        a, b = A.room_attachment, B.room_attachment
+        cx, cy = B.x - (b['x'] - a['x']), B.y - (b['y'] - a['y'])
+        X, Y = A.distal
+        return 1 if (cx - A.x)*(Y - A.y) - (cy - A.y)*(X - A.x) >= 0 else -1
+
+    def _assemble(self, plot_here, method):
+        self.ikea_evaluations = 0
+        cache = self.cache if method != 'analytic' or not self.four_bar else None
+        if cache is not None:
+            design = Design.from_murphy(self).values
+            key = cache.key(design, self.bedframe.angle, method, self.branch)
+            cached, exact = cache.lookup(key, design)
+            if exact:
+                self.state, assembled = cached
+                self.iterations = 0
+                if plot_here: self.plot()
+                return assembled
+            if cached is not None:
+                self.state = cached[0]
+
+        if method == 'analytic' and self.four_bar:
+            assembled = self._assemble_analytic()
+        elif method in ('analytic', 'newton'):
+            assembled = self._assemble_newton()
+        elif method == 'iterative':
+            assembled = self._assemble_iterative(plot_here)
+        else:
+            raise ValueError('Unknown assembly method: {}'.format(method))
+
+        if cache is not None:
+            cache.store(key, design, (self.state, assembled))
+        if plot_here: self.plot()
+        return assembled
+
+    def _assemble_analytic(self):
+        '''With the bed angle fixed, the bedframe and the two grounded links form a four-bar linkage.
+        A.distal lies on the circle of radius A.length about A's pivot. B.distal is A.distal shifted by the
+        (rotated) offset between the two attachment points, so A.distal also lies on the circle of radius
+        B.length about B's pivot shifted back by that offset. The pose is an intersection of the two circles.
+        If the circles do not meet, the gap at closest approach is split between the two links and False is returned.'''
+        A, B, bedframe = self.A, self.B, self.bedframe
+        self.iterations = 1
+
+        # attachment points relative to the bedframe origin, at the current bed angle
+        a, b = A.room_attachment, B.room_attachment
+        ax, ay = a['x'] - bedframe.x, a['y'] - bedframe.y
+        bx, by = b['x'] - bedframe.x, b['y'] - bedframe.y
+
+        # centre of the shifted B circle and its distance from A's pivot
+        cx, cy = B.x - (bx - ax), B.y - (by - ay)
+        dx, dy = cx - A.x, cy - A.y
+        d = hypot(dx, dy)
+        r0, r1 = A.length, B.length
+
+        if d == 0 or d > r0 + r1 or d < abs(r0 - r1):
+            # No pose exists. Keep A's current direction for concentric circles, otherwise take the point
+            # on A's circle nearest B's circle so that ikea_error reports the size of the gap.
+            if d == 0:
+                px, py = A.distal
+            else:
+                sign = -1 if r1 > r0 + d else 1
+                px, py = A.x + sign*r0*dx/d, A.y + sign*r0*dy/d
+            assembled = False
+        else:
+            along = (r0**2 - r1**2 + d**2)/(2*d)
+            h = max(r0**2 - along**2, 0)**0.5
+            mx, my = A.x + along*dx/d, A.y + along*dy/d
+            candidates = [(mx - h*dy/d, my + h*dx/d), (mx + h*dy/d, my - h*dx/d)]
+            # keep the branch of the linkage closest to the current pose
+            X, Y = A.distal
+            px, py = min(candidates, key = lambda p: (p[0]-X)**2 + (p[1]-Y)**2)
+            assembled = True
+
+        A.angle = self._nearest_angle(A.angle, degrees(atan2(py - A.y, px - A.x)))
+        qx, qy = px + (bx - ax), py + (by - ay)
+        B.angle = self._nearest_angle(B.angle, degrees(atan2(qy - B.y, qx - B.x)))
+        bedframe.x, bedframe.y = px - ax, py - ay
+        if not assembled:
+            # move the bedframe halfway across the gap, which minimizes the summed squared ikea error
+            gx, gy = B.distal[0] - qx, B.distal[1] - qy
+            bedframe.x, bedframe.y = bedframe.x + gx/2, bedframe.y + gy/2
+        return assembled
+
+    def _assemble_newton(self):
+        from Murphy.constraints import LoopClosure
+        constraints = LoopClosure(self)
+        self.iterations = constraints.solve()
+        self.ikea_evaluations = self.iterations
+        return self.ikea_error < self.threshold
+
+    @staticmethod
+    def _nearest_angle(current, new):
+        '''The equivalent of new (degrees) closest to current, so link angles do not jump by 360'''
+        return current + (new - current + 180) % 360 - 180
+
+    def _assemble_iterative(self, plot_here = False):
         # loop over the following variables, making small adjustments until ikea error is minimized (ideally zero):
-        # [bedframe.x, bedframe.y, A_link.angle, B_link.angle, C_link.angle]
-        # Note: it is necessary to reposition C_link (x,y) to B_link.distal after B_link.angle is adjusted.
-        # while True:
+        # [A_link.angle, B_link.angle, ..., bedframe.x, bedframe.y]
+        # Note: ikea_error repositions mounted links (x,y) onto their mounts after an angle is adjusted.
+        variables = [label + '.angle' for label in self.labels] + ['bedframe.x', 'bedframe.y']
         for i in range(1000):
-            for variable in ['A.angle', 'B.angle', 'bedframe.x', 'bedframe.y']:
+            for variable in variables:
                 errors  = []
                 for step in ['+=0.5', '-=1']:
                     exec('self.{variable} {step}'.format(variable = variable, step = step))
                     errors.append(self.ikea_error)
+                    self.ikea_evaluations += 1
                 partial_derivative = errors[0]-errors[1]
                 adjustment = self.learning_rate*partial_derivative + .5
                 exec('self.{variable} += {adjustment}'.format(variable = variable, adjustment = adjustment))
             if (i%5000==0) and plot_here:
                 self.plot()
+            self.ikea_evaluations += 1
             if self.ikea_error < 0.125: break
+        self.iterations = i + 1
         # print('Assembled in {} steps with Ikea error {}'.format(i,round(self.ikea_error,3)))
-        if plot_here: self.plot()
+        return self.ikea_error < 0.125
@@ -0,0 +1,300 @@
+from time import perf_counter
+import numpy as np
+from Murphy.design import Design
+from Murphy.kinematics import sweep_geometry
+from Murphy.collision import collision_depths
+from Murphy.solutions import SolutionStore
+from Murphy.telemetry import telemetry
+
+class MurphyBed():
+    '''The MurphyBed Class represents a collection of Murphy objects, all of the same design, solved over the full range of angles from deployed (0) to stowed (90)'''
+    cache = None # a PoseCache of whole sweeps, see solve_over_full_range
+    balance = np.array([5, 7, 2, 1, 1, 1, 50, 50, 1, 1,1, 1])
+    extrema_tolerance = 0.5 # degrees to which extreme values are located between samples (see refine_extrema), None to use the samples only
+    def __init__(self, bed, desired_deployed_height, desired_stowed_height):
+        self.bed = bed
+        self.desired_deployed_height, self.desired_stowed_height = desired_deployed_height, desired_stowed_height
+        self.collected_solutions = SolutionStore(bed)
+        self._murphy_error = None
+        self.pruned = False
+        self.method = 'analytic'
+        self.extrema = {}
+
+    def solve_over_full_range(self, steps, method = 'analytic', min_step = 0.5, tolerance = 5, max_iterations = 100):
+        '''Continuation sweep from deployed (0) to stowed (90). Each angle starts from the previous solution
+        extrapolated along the path (predictor), then assemble corrects it. The step starts at 90/(steps-1) and is
+        halved, down to min_step, wherever the prediction misses the solved pose by more than tolerance (degrees of
+        link angle or inches of bed travel), the solver needs more than max_iterations, or assembly starts failing.
+        It grows back, up to 90/(steps-1), once the path is smooth again, so hard angles get dense samples and easy
+        ones stay sparse. The first step is min_step, since there is no path to extrapolate yet.
+        If MurphyBed.cache is set, repeating a sweep of the same design from the same starting pose is a lookup, and
+        the sweep of a nearby design starts from the cached deployed pose.
+        Timing, sample and rejected step counts and failed angles are reported to telemetry when it is enabled.'''
+        start = perf_counter()
+        self.rejected_steps = 0
+        self.method = method
+        self._solve_over_full_range(steps, method, min_step, tolerance, max_iterations)
+        if telemetry.enabled:
+            solutions = self.collected_solutions
+            telemetry.emit('sweep', steps = steps, method = method, angles = len(solutions), rejected_steps = self.rejected_steps,
+                           failed = len(solutions.failed_angles), failed_angles = solutions.failed_angles.tolist(),
+                           max_residual = solutions.states['residual'].max(), seconds = perf_counter() - start)
+
+    def _solve_over_full_range(self, steps, method, min_step, tolerance, max_iterations):
+        if self.cache is not None:
+            design = np.concatenate([Design.from_murphy(self.bed).values, self.bed.state])
+            key = self.cache.key(design, steps, method, min_step, tolerance, max_iterations)
+            states, exact = self.cache.lookup(key, design)
+            if exact:
+                self.collected_solutions = SolutionStore.from_states(self.bed, states)
+                self.bed.bedframe.angle = states['angle'][-1]
+                self.bed.state = tuple(states[-1][self.collected_solutions.state_fields].tolist())
+                return
+            if states is not None and states[0]['assembled']:
+                # a nearby design in the same quantum: its deployed pose is a warm start for this one
+                self.bed.bedframe.angle = states['angle'][0]
+                self.bed.state = tuple(states[0][SolutionStore(self.bed).state_fields].tolist())
+        self._continuation_sweep(steps, method, min_step, tolerance, max_iterations)
+        if self.cache is not None:
+            self.cache.store(key, design, self.collected_solutions.states.copy())
+
+    def _continuation_sweep(self, steps, method, min_step, tolerance, max_iterations):
+        self.collected_solutions = SolutionStore(self.bed)
+        max_step = 90/(steps-1)
+        step = min_step
+        angle, path = 0.0, []
+
+        self.bed.bedframe.angle = angle
+        assembled = self.bed.assemble(method = method)
+        self.collected_solutions.append(self.bed, assembled)
+        path.append((angle, self.bed.state))
+
+        while angle < 90:
+            trial = 90.0 if angle + step + min_step > 90 else angle + step
+            start = self.bed.state
+            predicted = self._predict(path, trial)
+            self.bed.state = predicted
+            self.bed.bedframe.angle = trial
+            trial_assembled = self.bed.assemble(method = method)
+
+            miss = max(abs(p - s) for p, s in zip(predicted, self.bed.state))
+            hard = miss > tolerance or (trial_assembled and self.bed.iterations > max_iterations) or (assembled and not trial_assembled)
+            if hard and step > min_step:
+                # reject the step and retry closer to the last converged pose
+                self.bed.state = start
+                self.bed.bedframe.angle = angle
+                step = max(step/2, min_step)
+                self.rejected_steps += 1
+                continue
+
+            angle, assembled = trial, trial_assembled
+            self.collected_solutions.append(self.bed, assembled)
+            path.append((angle, self.bed.state))
+            if miss < tolerance/4:
+                step = min(step*2, max_step)
+
+    def optimize(self, strategy = 'nelder-mead', angle_steps = 5, processes = 1, stopping = None, callback = None, schedule = None, **options):
+        '''Optimize the design of self.bed to minimize murphy_error. strategy is 'gradient', 'nelder-mead', 'evolution'
+        or an Optimizer instance; options go to its constructor. stopping is a StoppingCriteria and callback receives
+        a history record after every iteration. schedule is the list of coarse screening tiers tried before the full
+        solve (see ParallelEvaluator), none by default; ParallelEvaluator.coarse_schedule opts in. self.bed is replaced by the best design
+        and solved, and the optimizer, with its best result, history and evaluation stats, is returned.'''
+        from Murphy.optimize import Objective, strategies
+        if isinstance(strategy, str):
+            strategy = strategies[strategy](stopping = stopping, callback = callback, **options)
+        objective = Objective(self, angle_steps, processes, schedule = schedule)
+        try:
+            values, _ = strategy.minimize(objective, objective.design.values)
+        finally:
+            objective.close()
+        strategy.stats = objective.stats
+        self.bed = objective.candidate(values)
+        self.solve_over_full_range(angle_steps)
+        return strategy
+
+    def deployed_template(self):
+        '''A copy of the bed in its solved deployed pose, or as it is before any sweep, to build other designs on.
+        Their sweeps start from there, which keeps them on the same branch of the linkage.'''
+        solutions = self.collected_solutions
+        return solutions[0] if 0 in solutions else self.bed.copy()
+
+    @staticmethod
+    def _predict(path, angle):
+        '''Linear extrapolation of the pose to a new bed angle from the last two converged poses'''
+        if len(path) < 2:
+            return path[-1][1]
+        (a0, s0), (a1, s1) = path[-2], path[-1]
+        t = (angle - a1)/(a1 - a0)
+        return tuple(v1 + t*(v1 - v0) for v0, v1 in zip(s0, s1))
+
+    def _components(self, states):
+        '''Bedframe and link geometry for rows of solved states, [bedframe, A, B, ...]'''
+        return sweep_geometry(self.collected_solutions.design, states)
+
+    def solve_at(self, angles):
+        '''States (rows like SolutionStore.states) solved at any angles within the sweep. Each pose starts from the
+        solutions on either side of it, interpolated, so it stays on the same branch of the linkage.'''
+        solutions = self.collected_solutions
+        states = solutions.states
+        solved = np.zeros(len(angles), dtype = solutions.dtype)
+        murphy = solutions.design.copy()
+        for j, angle in enumerate(angles):
+            i = int(np.clip(np.searchsorted(states['angle'], angle), 1, len(states) - 1))
+            before, after = states[i - 1], states[i]
+            t = (angle - before['angle'])/(after['angle'] - before['angle'])
+            murphy.bedframe.angle = angle
+            murphy.state = tuple((1 - t)*before[field] + t*after[field] for field in solutions.state_fields)
+            assembled = murphy.assemble(method = self.method)
+            solved[j] = (angle,) + tuple(murphy.state) + (murphy.ikea_error, assembled)
+        return solved
+
+    def refine_extrema(self, measures, components, points = 8):
+        '''The largest value of each measure over the continuous range of the sweep, as {name: (angle, value)}, also
+        kept in self.extrema. A measure maps the geometry of some states (see _components) to one value per state.
+        Every sampled local maximum, the ends of the sweep included, brackets a peak with its neighbours; every round
+        solves points poses evenly inside each bracket, all measures and peaks at once, and narrows the bracket around
+        the best of them, until it is narrower than extrema_tolerance. The best of all peaks is kept.'''
+        angles = self.collected_solutions.states['angle']
+        best, peaks, brackets = {}, {}, {}
+        for name, measure in measures.items():
+            values = measure(components)
+            i = int(np.argmax(values))
+            best[name] = angles[i], values[i]
+            # samples at least as high as both neighbours and higher than one of them
+            padded = np.concatenate([[-np.inf], values, [-np.inf]])
+            left, right = padded[1:-1] - padded[:-2], padded[1:-1] - padded[2:]
+            for i in np.flatnonzero((left >= 0) & (right >= 0) & ((left > 0) | (right > 0))):
+                peaks[name, i] = angles[i], values[i]
+                brackets[name, i] = angles[max(i - 1, 0)], angles[min(i + 1, len(angles) - 1)]
+        while self.extrema_tolerance is not None and brackets:
+            grids = {peak: np.linspace(low, high, points + 2) for peak, (low, high) in brackets.items()}
+            solved = self.solve_at(np.concatenate([grid[1:-1] for grid in grids.values()]))
+            geometry = self._components(solved)
+            values = {name: measure(geometry) for name, measure in measures.items()}
+            for k, (peak, grid) in enumerate(grids.items()):
+                peak_values = values[peak[0]][k*points:(k + 1)*points]
+                i = int(np.argmax(peak_values))
+                if peak_values[i] > peaks[peak][1]:
+                    peaks[peak] = grid[i + 1], peak_values[i]
+                # the new bracket is the neighbours of the best angle, or of the nearer end if the ends are still best
+                centre = int(np.argmin(np.abs(grid - peaks[peak][0])))
+                low, high = grid[max(centre - 1, 0)], grid[min(centre + 1, len(grid) - 1)]
+                if high - low < self.extrema_tolerance:
+                    del brackets[peak]
+                else:
+                    brackets[peak] = low, high
+        for (name, _), (angle, value) in peaks.items():
+            if value > best[name][1]:
+                best[name] = angle, value
+        self.extrema.update(best)
+        return best
+
+    @property
+    def murphy_error(self):
+        '''murphy_error is the sum of all differences between current design and optimal design. Used to optimize fixed, positions and rigid components. 
+        Calculation of Murphy Error requires collected_solutions for all angles between 0 and 90.
+        It is computed once per solve and kept until the design or the solutions change.'''
+        key = (self.collected_solutions, len(self.collected_solutions), tuple(Design.from_murphy(self.bed).values))
+        cached = self._murphy_error
+        if cached is None or cached[0][0] is not key[0] or cached[0][1:] != key[1:]:
+            self._murphy_error = cached = key, self.evaluate_murphy_error()
+        return cached[1]
+
+    def evaluate_murphy_error(self, bound = None):
+        '''Compute murphy_error (total, weighted terms). With a bound, terms are added cheapest first and evaluation
+        stops once the partial sum exceeds bound. The design is then pruned: self.pruned is set, the total is inf,
+        so it never ranks against designs evaluated in full, and the terms not evaluated are nan.'''
+        start = perf_counter()
+        errors = np.full(len(self.balance), np.nan)
+        total = 0
+        self.pruned = False
+        for i, error in self._murphy_error_terms():
+            errors[i] = error/self.balance[i]
+            total += errors[i]
+            if bound is not None and total > bound:
+                total, self.pruned = np.inf, True
+                break
+        if telemetry.enabled:
+            telemetry.emit('objective', error = total, bound = bound, pruned = self.pruned, seconds = perf_counter() - start)
+        return total, errors
+
+    def _murphy_error_terms(self):
+        '''Yields (index, unweighted error) for each term of murphy_error, cheapest first'''
+        solutions = self.collected_solutions
+        design = solutions.design
+        deployed = solutions[0]
+        stowed = solutions[90]
+
+        # When deployed, the bed should be at desired height
+        yield 0, (deployed.bedframe.y+deployed.bedframe.t-self.desired_deployed_height)**2
+        
+        # When deployed, the head of the bed should be close to the wall
+        yield 1, deployed.bedframe.x**2
+        
+        # When stowed, the bed should be flat up against the wall
+        yield 2, (stowed.bedframe.x-stowed.bedframe.h_headboard)**2
+
+        # When stowed, the foot of the bed should be at desired height below the window
+        yield 3, (stowed.bedframe.y+stowed.bedframe.l - self.desired_stowed_height)**2
+
+        # Link A,B Attachment point must be on the bedframe (term 10 covers B and any further links attached to it)
+        def off_bedframe(link):
+            if link.attachment is None or link.attached_to is not None:
+                return 0
+            x = link.attachment['x']
+            y = link.attachment['y']
+            if (0 < x < design.bedframe.l) and (0 < y < design.bedframe.t):
+                return 0
+            elif (0 < x < design.bedframe.depth_of_headboard) and (0 < y < design.bedframe.h_headboard):
+                return 0
+            else:
+                # centre of the bedframe, in the same bedframe coordinates as the attachment
+                X,Y = design.bedframe.l/2, design.bedframe.t/2
+                return (X-x)**2 + (Y-y)**2
+
+        yield 9, off_bedframe(design.A)
+        yield 10, sum(off_bedframe(link) for link in design.links[1:])
+
+        # when stowed, no part of the links should extend forward of the bedframe if it is above the floor
+        def stowed_encroachment(link):
+            if (link.extents['top'] > 0) and (link.extents['right'] > stowed.bedframe.x):
+                return (link.extents['right']-stowed.bedframe.x)**2
+            else: return 0
+
+        yield 5, max([stowed_encroachment(link) for link in stowed.links])
+        
+        # when deployed, no part of the links should extend above/forward of the bedframe
+        def deployed_encroachment(link):
+            if (link.extents['right'] > deployed.bedframe.x) and (link.extents['top'] > (deployed.bedframe.y+deployed.bedframe.t)):
+                return (link.extents['top'] - deployed.bedframe.y+deployed.bedframe.t)**2
+            else: return 0
+
+        yield 6, max([deployed_encroachment(link) for link in deployed.links])
+
+        #the bed should be buildable
+        states = solutions.states
+        yield 8, states['residual'].max()**2
+
+        # The remaining terms need the geometry at every solved angle, computed for all angles at once
+        components = self._components(states)
+
+        # Their extreme values are refined from poses solved at the angles between the samples
+        extrema = self.refine_extrema({
+            'left': lambda components: -np.minimum.reduce([component['extents']['left'] for component in components]),
+            'floor_opening': lambda components: np.maximum.reduce([component['floor_opening'] for component in components])},
+            components)
+
+        # No part of the assembly should ever extend outside of the house
+        left_most = min(0, -extrema['left'][1])
+        yield 4, left_most**2
+
+        # the floor opening should not be much larger than the thickness of the beframe
+        floor_opening = max(0, extrema['floor_opening'][1])
+        if floor_opening > stowed.bedframe.x:
+            yield 7, floor_opening**2
+        else:
+            yield 7, 0
+
+        # No two parts should collide anywhere in the motion
+        depths = collision_depths(design, states, components)
+        yield 11, sum(depth.max()**2 for depth in depths.values())
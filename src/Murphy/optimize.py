@@ -0,0 +1,191 @@
+'''Design optimizers for MurphyBed.
+
+All strategies minimize murphy_error over a Design vector, share the same StoppingCriteria and report every
+iteration to an optional callback as a history record:
+
+    {'iteration', 'evaluations', 'error', 'errors', 'design', 'step'}
+
+where error/errors/design describe the best design found so far and step is the strategy's current step size.
+Candidates are always evaluated in batches, so any strategy can use a pool of worker processes.
+'''
+import numpy as np
+from Murphy.design import Design
+from Murphy.parallel import ParallelEvaluator
+
+class StoppingCriteria():
+    '''Stop after max_iterations or max_evaluations, or when the best error has improved by less than
+    tolerance over the last patience iterations'''
+    def __init__(self, max_iterations = 100, max_evaluations = 10000, tolerance = 1e-6, patience = 20):
+        self.max_iterations, self.max_evaluations = max_iterations, max_evaluations
+        self.tolerance, self.patience = tolerance, patience
+
+    def done(self, history, evaluations):
+        if len(history) >= self.max_iterations or evaluations >= self.max_evaluations:
+            return True
+        if len(history) > self.patience:
+            return history[-self.patience-1]['error'] - history[-1]['error'] < self.tolerance
+        return False
+
+class Objective():
+    '''murphy_error of design vectors. Every call evaluates a batch of vectors, in worker processes unless processes = 1.
+    A batch can be given a bound, the error a candidate has to come in under to be of any use to the optimizer.
+    Candidates that cannot are pruned, by the coarse tiers of schedule (see ParallelEvaluator) or part way through
+    their terms, and come back with an error of inf.'''
+    def __init__(self, murphy_bed, angle_steps, processes = 1, schedule = None):
+        self.template = murphy_bed.deployed_template()
+        self.design = Design.from_murphy(self.template)
+        self.evaluator = ParallelEvaluator(murphy_bed.desired_deployed_height, murphy_bed.desired_stowed_height,
+                                           angle_steps, processes, schedule)
+
+    @property
+    def evaluations(self):
+        return self.evaluator.evaluations
+
+    @property
+    def stats(self):
+        return self.evaluator.stats
+
+    def candidate(self, values):
+        '''A Murphy built from the template with these design values'''
+        return self.design.with_values(values).apply(self.template.copy())
+
+    def __call__(self, batch, bound = None):
+        '''(error, terms) for each design vector in batch, inf for those pruned by bound'''
+        candidates = [self.candidate(v) for v in batch]
+        return [(float(error), errors) for error, errors in self.evaluator.evaluate(candidates, bound)]
+
+    def close(self):
+        self.evaluator.close()
+
+class Optimizer():
+    '''Base class for the strategies. Subclasses implement _minimize and call _update/_record.'''
+    def __init__(self, stopping = None, callback = None):
+        self.stopping = stopping or StoppingCriteria()
+        self.callback = callback
+
+    def minimize(self, objective, x0):
+        '''Returns the best design vector found and its (error, terms). The iterations are kept in self.history.'''
+        self.history = []
+        self.best = None
+        self._minimize(objective, np.array(x0, dtype = float))
+        return self.best
+
+    def _update(self, values, result):
+        if self.best is None or result[0] < self.best[1][0]:
+            self.best = (np.array(values, dtype = float), result)
+
+    def _record(self, objective, step):
+        '''Log one iteration. Returns True when the run should stop.'''
+        values, (error, errors) = self.best
+        record = {'iteration': len(self.history), 'evaluations': objective.evaluations,
+                  'error': error, 'errors': errors, 'design': values.copy(), 'step': step}
+        self.history.append(record)
+        if self.callback: self.callback(record)
+        return self.stopping.done(self.history, objective.evaluations)
+
+class GradientDescent(Optimizer):
+    '''Steepest descent on a central-difference gradient of all design variables, followed by a backtracking
+    line search. The 2n gradient points and the line_search_points trial steps are each evaluated as one batch.
+    The gradient points are solved in full; the line search trials are bounded by the current error, as a trial
+    above it is never taken.'''
+    def __init__(self, step = 1.0, h = 0.25, min_step = 1e-3, line_search_points = 4, armijo = 1e-4, **kwargs):
+        super().__init__(**kwargs)
+        self.step, self.h, self.min_step = step, h, min_step
+        self.line_search_points, self.armijo = line_search_points, armijo
+
+    def _minimize(self, objective, x):
+        fx = objective([x])[0]
+        self._update(x, fx)
+        step = self.step
+        n = len(x)
+        while True:
+            offsets = self.h*np.eye(n)
+            results = objective(list(x + offsets) + list(x - offsets))
+            gradient = np.array([(results[i][0] - results[n+i][0])/(2*self.h) for i in range(n)])
+            slope = np.linalg.norm(gradient)
+            taken = 0
+            while slope > 0 and step >= self.min_step and not taken:
+                trials = step*0.5**np.arange(self.line_search_points)
+                candidates = [x - t*gradient/slope for t in trials]
+                for t, candidate, result in zip(trials, candidates, objective(candidates, bound = fx[0])):
+                    if result[0] <= fx[0] - self.armijo*t*slope:
+                        x, fx, taken = candidate, result, t
+                        break
+                else:
+                    step = trials[-1]/2
+            self._update(x, fx)
+            if self._record(objective, taken) or not taken:
+                break
+            # allow the next line search to start from a longer step after a successful full step
+            step = 2*taken if taken == step else taken
+
+class NelderMead(Optimizer):
+    '''Downhill simplex. The initial simplex and shrink steps are evaluated as batches. Each trial point is only
+    compared with one error, the second worst for a reflection, the reflection for an expansion and the worst for
+    a contraction, so it is bounded by that error.'''
+    def __init__(self, initial_step = 1.0, alpha = 1, gamma = 2, rho = 0.5, sigma = 0.5, **kwargs):
+        super().__init__(**kwargs)
+        self.initial_step = initial_step
+        self.alpha, self.gamma, self.rho, self.sigma = alpha, gamma, rho, sigma
+
+    def _minimize(self, objective, x0):
+        simplex = [x0] + [x0 + self.initial_step*e for e in np.eye(len(x0))]
+        results = objective(simplex)
+        for x, result in zip(simplex, results): self._update(x, result)
+        while True:
+            order = np.argsort([result[0] for result in results])
+            simplex, results = [simplex[i] for i in order], [results[i] for i in order]
+            centroid = np.mean(simplex[:-1], axis = 0)
+            worst, f_worst = simplex[-1], results[-1][0]
+
+            reflected = centroid + self.alpha*(centroid - worst)
+            r = objective([reflected], bound = results[-2][0])[0]
+            self._update(reflected, r)
+            if results[0][0] <= r[0] < results[-2][0]:
+                simplex[-1], results[-1] = reflected, r
+            elif r[0] < results[0][0]:
+                expanded = centroid + self.gamma*(reflected - centroid)
+                e = objective([expanded], bound = r[0])[0]
+                self._update(expanded, e)
+                simplex[-1], results[-1] = (expanded, e) if e[0] < r[0] else (reflected, r)
+            else:
+                contracted = centroid + self.rho*(worst - centroid)
+                c = objective([contracted], bound = f_worst)[0]
+                self._update(contracted, c)
+                if c[0] < f_worst:
+                    simplex[-1], results[-1] = contracted, c
+                else:
+                    best = simplex[0]
+                    simplex = [best] + [best + self.sigma*(x - best) for x in simplex[1:]]
+                    results = results[:1] + objective(simplex[1:])
+                    for x, result in zip(simplex[1:], results[1:]): self._update(x, result)
+
+            size = max(np.abs(x - simplex[0]).max() for x in simplex[1:])
+            if self._record(objective, size):
+                break
+
+class EvolutionStrategy(Optimizer):
+    '''(mu, lambda) evolution strategy. Each generation of population candidates is sampled around the mean of
+    the best mu of the previous one and evaluated as one batch. sigma grows while generations keep improving
+    on the best design and shrinks when they do not. The whole generation is ranked, so it is never bounded.'''
+    def __init__(self, population = 16, mu = None, sigma = 1.0, seed = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.population, self.mu = population, mu or population//4
+        self.sigma, self.seed = sigma, seed
+
+    def _minimize(self, objective, mean):
+        rng = np.random.default_rng(self.seed)
+        self._update(mean, objective([mean])[0])
+        sigma = self.sigma
+        while True:
+            candidates = mean + sigma*rng.standard_normal((self.population, len(mean)))
+            results = objective(list(candidates))
+            best_error = self.best[1][0]
+            for x, result in zip(candidates, results): self._update(x, result)
+            order = np.argsort([result[0] for result in results])
+            mean = candidates[order[:self.mu]].mean(axis = 0)
+            sigma *= 1.2 if results[order[0]][0] < best_error else 0.85
+            if self._record(objective, sigma):
+                break
+
+strategies = {'gradient': GradientDescent, 'nelder-mead': NelderMead, 'evolution': EvolutionStrategy}
@@ -0,0 +1,95 @@
+from multiprocessing import Pool
+from time import perf_counter
+from Murphy.murphy_bed import MurphyBed
+
+def evaluate_design(job):
+    '''Solve one candidate design over the full range of angles and return its murphy error.
+    The coarse tiers of the schedule are tried first: if the error of a cheap sweep already exceeds bound by more
+    than the tier's margin (a fraction), the candidate cannot beat the best design and is not solved at full
+    resolution. The full solve adds up its terms against bound too (see MurphyBed.evaluate_murphy_error). A pruned
+    candidate's error is inf. Returns (error, terms, pruned, seconds) where pruned is the index of the tier that
+    pruned the candidate, len(schedule) for the full solve, or None, and seconds the time per tier.
+    This runs in a worker process, so it only takes and returns picklable values.'''
+    bed, desired_deployed_height, desired_stowed_height, angle_steps, schedule, bound = job
+    seconds = []
+    for tier, settings in enumerate(schedule):
+        start = perf_counter()
+        settings = dict(settings)
+        murphy_bed = MurphyBed(bed.copy(), desired_deployed_height, desired_stowed_height)
+        murphy_bed.extrema_tolerance = settings.pop('extrema_tolerance', murphy_bed.extrema_tolerance)
+        margin = settings.pop('margin', 0)
+        murphy_bed.solve_over_full_range(**settings)
+        error, errors = murphy_bed.evaluate_murphy_error(None if bound is None else (1 + margin)*bound)
+        seconds.append(perf_counter() - start)
+        if murphy_bed.pruned:
+            return error, errors, tier, seconds
+    start = perf_counter()
+    murphy_bed = MurphyBed(bed, desired_deployed_height, desired_stowed_height)
+    murphy_bed.solve_over_full_range(angle_steps)
+    error, errors = murphy_bed.evaluate_murphy_error(bound)
+    seconds.append(perf_counter() - start)
+    return error, errors, len(schedule) if murphy_bed.pruned else None, seconds
+
+class ParallelEvaluator():
+    '''Evaluates independent candidate designs (Murphy objects) on a pool of worker processes.
+    Results always come back in the order of the candidates.
+    With processes = 1 the candidates are evaluated in this process, which is handy for debugging.
+
+    Before the full solve, candidates are screened by the tiers of schedule (none by default, see evaluate_design).
+    A tier is a dict of solve_over_full_range arguments, plus optionally extrema_tolerance and margin.
+    coarse_schedule is a cheap tier to opt in with; stats counts the candidates pruned by each tier and the time spent in each.'''
+    schedule = []
+    coarse_schedule = [{'steps': 3, 'min_step': 15, 'tolerance': 30, 'extrema_tolerance': None, 'margin': 0.1}]
+
+    def __init__(self, desired_deployed_height, desired_stowed_height, angle_steps, processes = None, schedule = None):
+        self.desired_deployed_height, self.desired_stowed_height = desired_deployed_height, desired_stowed_height
+        self.angle_steps = angle_steps
+        self.processes = processes
+        if schedule is not None:
+            self.schedule = list(schedule)
+        self.evaluations = 0
+        self.pruned = [0]*(len(self.schedule) + 1)
+        self.seconds = [0.0]*(len(self.schedule) + 1)
+        self._pool = None
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = Pool(self.processes)
+        return self._pool
+
+    def evaluate(self, candidates, bound = None):
+        '''murphy_error (total, terms) for each candidate design. Candidates that cannot come in under bound are
+        pruned: their total is inf, and the terms not evaluated are nan.'''
+        jobs = [(bed, self.desired_deployed_height, self.desired_stowed_height, self.angle_steps, self.schedule, bound)
+                for bed in candidates]
+        self.evaluations += len(jobs)
+        if self.processes == 1:
+            results = [evaluate_design(job) for job in jobs]
+        else:
+            results = self.pool.map(evaluate_design, jobs)
+        for _, _, pruned, seconds in results:
+            if pruned is not None:
+                self.pruned[pruned] += 1
+            for i, t in enumerate(seconds):
+                self.seconds[i] += t
+        return [(error, errors) for error, errors, _, _ in results]
+
+    @property
+    def stats(self):
+        '''Candidates evaluated, pruned by each screening tier and by the full solve, solved in full, and seconds
+        spent in each tier'''
+        return {'evaluations': self.evaluations, 'pruned': list(self.pruned),
+                'full': self.evaluations - sum(self.pruned[:-1]), 'seconds': list(self.seconds)}
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
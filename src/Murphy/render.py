@@ -0,0 +1,167 @@
+'''Headless rendering of sweeps and optimization histories.
+
+Bedframe.plot and Link.plot draw one pose with a handful of matplotlib calls per part, and end in plt.show().
+Here every part of every pose comes from one batch kinematics call, and each part type is drawn as one
+LineCollection (outlines, edges, end circles) or one scatter (margin and attachment points), however many poses
+there are. Figures use the Agg canvas directly, so nothing opens a window or blocks, and pyplot is never loaded:
+
+    render_sweep(murphy_bed, 'sweep.png')                  # every solved pose, overlaid
+    render_motion(murphy_bed, 'motion.gif')                # deployed to stowed, one frame per pose
+    render_history(murphy_bed, optimizer.history, 'history.gif')
+
+An animation is written as a GIF when the path ends in .gif, otherwise as numbered PNG frames (path is then a
+pattern such as 'motion/{:03d}.png'). matplotlib (and Pillow, which it depends on, for GIFs) is only imported
+when something is rendered.
+'''
+import numpy as np
+from Murphy.kinematics import sweep_geometry
+from Murphy.design import Design
+
+# unit circle the link ends are drawn with, computed once instead of per call
+circle = np.stack([np.cos(np.radians(np.linspace(0, 360, 37))), np.sin(np.radians(np.linspace(0, 360, 37)))], axis = -1)
+
+outline = ['lower_head', 'lower_foot', 'upper_foot', 'upper_head', 'lower_head']
+margins = ['head_lower_margin', 'head_upper_margin', 'foot_upper_margin', 'foot_lower_margin']
+
+def shapes(design, states):
+    '''Everything drawn for the design (a Murphy) at each of states (rows like SolutionStore.states), as arrays
+    with one leading row per state: {'bedframe': lines, 'A': lines, 'B': lines, ..., 'margins': points,
+    'attachments': points}. lines is a list of (n, k, points, 2) arrays, points is (n, k, 2).'''
+    components = sweep_geometry(design, states)
+    frame = components[0]
+    n = len(states)
+    drawn = {'bedframe': [np.stack([frame[name].xy for name in outline], axis = -2).reshape(n, 1, len(outline), 2)],
+             'margins': np.stack([frame[name].xy for name in margins], axis = -2).reshape(n, len(margins), 2)}
+
+    attachments = [np.zeros((n, 0, 2))]
+    for label, link, geometry in zip(design.labels, design.links, components[1:]):
+        edges = np.stack([np.stack([edge.p0.xy, edge.p1.xy], axis = -2).reshape(n, 2, 2) for edge in geometry['edges']], axis = 1)
+        ends = np.stack([geometry['pivot'].xy.reshape(n, 2), geometry['distal'].xy.reshape(n, 2)], axis = 1)
+        circles = ends[:, :, None, :] + link.width/2*circle
+        drawn[label] = [edges, circles]
+        if geometry['attachment'] is not None:
+            attachments.append(geometry['attachment'].xy.reshape(n, 1, 2))
+    drawn['attachments'] = np.concatenate(attachments, axis = 1)
+    return drawn
+
+def _lines(lines, index = slice(None)):
+    '''The polylines of some of the states as a flat list, the segments of a LineCollection'''
+    return [polyline for array in lines for polyline in array[index].reshape(-1, array.shape[-2], 2)]
+
+def _points(points, index = slice(None)):
+    return points[index].reshape(-1, 2)
+
+def _figure(size, dpi):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    figure = Figure(figsize = size, dpi = dpi)
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot(111)
+    ax.set_aspect('equal')
+    return figure, ax
+
+class SweepRenderer():
+    '''The collections drawing a design at a set of states on one Agg figure. show() points them at some of the
+    states without creating new artists. The axes, ticks and labels are drawn once and kept as a background, so
+    each frame of an animation only redraws the collections and the title.'''
+    def __init__(self, design, states, size = (6, 6), dpi = 100, alpha = None):
+        from matplotlib.collections import LineCollection
+        self.shapes = shapes(design, states)
+        self.figure, self.ax = _figure(size, dpi)
+        colors = dict({'bedframe': 'k'}, **{label: link.color for label, link in zip(design.labels, design.links)})
+        if alpha is None:
+            alpha = min(1, 3/len(states)) if len(states) else 1
+        self.lines = {}
+        for part, color in colors.items():
+            self.lines[part] = LineCollection([], colors = color, linewidths = 1, alpha = alpha)
+            self.ax.add_collection(self.lines[part])
+        self.margins = self.ax.scatter(np.zeros(0), np.zeros(0), s = 6, c = 'tab:blue', alpha = alpha)
+        self.attachments = self.ax.scatter(np.zeros(0), np.zeros(0), s = 12, marker = 'x', c = 'gray', alpha = alpha)
+
+        # fixed limits covering every state, so consecutive frames line up
+        points = np.concatenate([np.concatenate([a.reshape(-1, 2) for a in self.shapes[part]]) for part in colors] +
+                                [self.shapes['attachments'].reshape(-1, 2)])
+        low, high = points.min(axis = 0), points.max(axis = 0)
+        pad = 0.05*(high - low).max()
+        self.ax.set_xlim(low[0] - pad, high[0] + pad)
+        self.ax.set_ylim(min(low[1], 0) - pad, high[1] + pad)
+        self.ax.axhline(0, c = 'gray', lw = 0.5)
+        self.ax.axvline(0, c = 'gray', lw = 0.5)
+
+        self.artists = list(self.lines.values()) + [self.margins, self.attachments, self.ax.title]
+        for artist in self.artists:
+            artist.set_animated(True)
+        self._background = None
+
+    def show(self, index = slice(None), title = None):
+        '''Draw the states at index (a slice, an int or an index array)'''
+        if isinstance(index, (int, np.integer)):
+            index = [index]
+        for part, collection in self.lines.items():
+            collection.set_segments(_lines(self.shapes[part], index))
+        self.margins.set_offsets(_points(self.shapes['margins'], index))
+        self.attachments.set_offsets(_points(self.shapes['attachments'], index))
+        if title is not None:
+            self.ax.set_title(title)
+        canvas = self.figure.canvas
+        if self._background is None:
+            canvas.draw()
+            self._background = canvas.copy_from_bbox(self.figure.bbox)
+        else:
+            canvas.restore_region(self._background)
+        for artist in self.artists:
+            self.figure.draw_artist(artist)
+        return self
+
+    def image(self):
+        '''The current drawing as an RGBA array'''
+        return np.asarray(self.figure.canvas.buffer_rgba()).copy()
+
+    def save(self, path):
+        '''Write the current drawing as an image file'''
+        from matplotlib.image import imsave
+        imsave(path, self.image())
+
+def save_frames(images, path, duration = 100):
+    '''Write RGBA images as a GIF if path ends in .gif (duration ms per frame), else as PNGs named path.format(i)'''
+    if path.lower().endswith('.gif'):
+        from PIL import Image
+        # one palette for every frame, taken from the first, is much faster than quantizing each frame
+        frames = [Image.fromarray(image[..., :3]) for image in images]
+        palette = frames[0].quantize(64)
+        frames = [palette] + [frame.quantize(palette = palette, dither = 0) for frame in frames[1:]]
+        frames[0].save(path, save_all = True, append_images = frames[1:], duration = duration, loop = 0)
+    else:
+        from matplotlib.image import imsave
+        for i, image in enumerate(images):
+            imsave(path.format(i), image)
+
+def render_sweep(murphy_bed, path, **options):
+    '''Every solved pose of murphy_bed overlaid in one image'''
+    solutions = murphy_bed.collected_solutions
+    renderer = SweepRenderer(solutions.design, solutions.states, **options)
+    renderer.show(title = 'murphy error {:.2f}'.format(murphy_bed.murphy_error[0]))
+    renderer.save(path)
+
+def render_motion(murphy_bed, path, duration = 100, **options):
+    '''The motion from deployed to stowed, one frame per solved pose'''
+    solutions = murphy_bed.collected_solutions
+    states = solutions.states
+    renderer = SweepRenderer(solutions.design, states, alpha = 1, **options)
+    images = [renderer.show(i, title = '{:.1f}\N{DEGREE SIGN}'.format(angle)).image() for i, angle in enumerate(states['angle'])]
+    save_frames(images, path, duration)
+
+def render_history(murphy_bed, records, path, angle_steps = 5, every = 1, duration = 200, **options):
+    '''The best design of every few iterations of an optimization, each frame showing its solved sweep.
+    records are optimizer history records or run log records (anything with 'design' and 'error').'''
+    from Murphy.murphy_bed import MurphyBed
+    template = murphy_bed.deployed_template()
+    design = Design.from_murphy(template)
+    images = []
+    for i in range(0, len(records), every):
+        candidate = MurphyBed(design.with_values(records[i]['design']).apply(template.copy()),
+                              murphy_bed.desired_deployed_height, murphy_bed.desired_stowed_height)
+        candidate.solve_over_full_range(angle_steps)
+        renderer = SweepRenderer(candidate.collected_solutions.design, candidate.collected_solutions.states, **options)
+        images.append(renderer.show(title = 'iteration {}, murphy error {:.2f}'.format(i, float(records[i]['error']))).image())
+    save_frames(images, path, duration)
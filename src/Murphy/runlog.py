@@ -0,0 +1,96 @@
+'''Append-only log of an optimization run.
+
+The file is a JSON header line, padded to a multiple of 64 bytes, followed by one fixed-size binary record per
+iteration. The header holds the design variable names and the record layout, so a log can be read back without
+any of the classes that wrote it, and lazily through a memory map however long the run was:
+
+    names, records = read_run_log('murphy.runlog')
+    records['error'][-1000:], records['design'][:, names.index('A.x')]
+
+A record that was only partly written when a run was killed is ignored, so a run can always resume from the
+last complete record.
+'''
+import json
+import os
+import numpy as np
+
+MAGIC = 'murphy-runlog'
+
+def record_dtype(n_variables, n_terms):
+    return np.dtype([('cycle', np.int64), ('iteration', np.int64), ('evaluations', np.int64),
+                     ('error', float), ('step', float), ('design', float, (n_variables,)), ('errors', float, (n_terms,))])
+
+def _read_header(f):
+    line = f.readline()
+    header = json.loads(line)
+    if header.get('format') != MAGIC:
+        raise ValueError('Not a murphy run log')
+    return header, len(line)
+
+def read_run_log(path):
+    '''The design variable names and the complete records of a run log, as a read-only structured memmap'''
+    with open(path, 'rb') as f:
+        header, offset = _read_header(f)
+    dtype = record_dtype(len(header['names']), header['terms'])
+    count = (os.path.getsize(path) - offset)//dtype.itemsize
+    if count == 0:
+        return header['names'], np.zeros(0, dtype = dtype)
+    return header['names'], np.memmap(path, dtype = dtype, mode = 'r', offset = offset, shape = (count,))
+
+class RunLog():
+    '''Writes records to a run log, buffering at most buffer records between writes.
+    An existing log with the same design variables is appended to, continuing its cycle count.'''
+    def __init__(self, path, names, n_terms, buffer = 100):
+        self.path, self.names, self.buffer = path, list(names), buffer
+        self.dtype = record_dtype(len(self.names), n_terms)
+        self._pending = []
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                header, offset = _read_header(f)
+            if header['names'] != self.names or header['terms'] != n_terms:
+                raise ValueError('{} was written for a different design'.format(path))
+            # drop a partly written last record
+            self.cycles = (os.path.getsize(path) - offset)//self.dtype.itemsize
+            with open(path, 'r+b') as f:
+                f.truncate(offset + self.cycles*self.dtype.itemsize)
+        else:
+            header = json.dumps({'format': MAGIC, 'version': 1, 'names': self.names, 'terms': n_terms})
+            header += ' '*(-(len(header) + 1) % 64) + '\n'
+            with open(path, 'wb') as f:
+                f.write(header.encode())
+            self.cycles = 0
+
+    def append(self, record):
+        '''Add an optimizer history record (see Murphy.optimize)'''
+        row = np.zeros((), dtype = self.dtype)
+        row['cycle'] = self.cycles
+        for field in ['iteration', 'evaluations', 'error', 'step', 'design', 'errors']:
+            row[field] = record[field]
+        self._pending.append(row)
+        self.cycles += 1
+        if len(self._pending) >= self.buffer:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            with open(self.path, 'ab') as f:
+                f.write(np.array(self._pending, dtype = self.dtype).tobytes())
+            self._pending = []
+
+    def last(self):
+        '''The most recent record, or None for an empty log'''
+        self.flush()
+        _, records = read_run_log(self.path)
+        return records[-1] if len(records) else None
+
+    def __len__(self):
+        return self.cycles
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
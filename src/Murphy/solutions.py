@@ -0,0 +1,69 @@
+from collections.abc import Mapping
+import numpy as np
+
+class SolutionStore(Mapping):
+    '''Solved poses of one design over a range of bed angles, stored as rows of a structured array.
+    Only the variables that assemble changes are kept. Indexing by angle rebuilds a Murphy view of that pose,
+    so the store can be used wherever the old {angle: deepcopy(murphy)} dict was.
+    The rows have a <label>_angle field for every link, A_angle, B_angle, ... (see dtype_for).'''
+    dtype = np.dtype([('angle', float), ('x', float), ('y', float),
+                      ('A_angle', float), ('B_angle', float), ('residual', float), ('assembled', bool)])
+
+    def __init__(self, design, capacity = 32):
+        # a private copy, so later changes to the design being optimized do not leak into these views
+        self.design = design.copy()
+        self.state_fields = ['x', 'y'] + [label + '_angle' for label in design.labels]
+        self.dtype = self.dtype_for(design.labels)
+        self.rows = np.zeros(capacity, dtype = self.dtype)
+        self._index = {}
+
+    @classmethod
+    def dtype_for(cls, labels):
+        '''The row layout for a Murphy with links labelled labels'''
+        return np.dtype([('angle', float), ('x', float), ('y', float)] + [(label + '_angle', float) for label in labels] +
+                        [('residual', float), ('assembled', bool)])
+
+    @classmethod
+    def from_states(cls, design, states):
+        '''A store holding a copy of rows previously taken from SolutionStore.states'''
+        store = cls(design, capacity = max(len(states), 1))
+        store.rows[:len(states)] = states
+        store._index = {angle: i for i, angle in enumerate(states['angle'])}
+        return store
+
+    def append(self, murphy, assembled = True):
+        '''Record the current pose of murphy, and whether assemble succeeded for it'''
+        n = len(self._index)
+        if n == len(self.rows):
+            self.rows = np.concatenate([self.rows, np.zeros(n, dtype = self.dtype)])
+        self.rows[n] = (murphy.bedframe.angle,) + tuple(murphy.state) + (murphy.ikea_error, assembled)
+        self._index[murphy.bedframe.angle] = n
+
+    @property
+    def states(self):
+        '''The filled rows, in the order they were solved'''
+        return self.rows[:len(self._index)]
+
+    @property
+    def failed_angles(self):
+        '''Angles at which no exact pose was found'''
+        states = self.states
+        return states['angle'][~states['assembled']]
+
+    def __getitem__(self, angle):
+        row = self.rows[self._index[angle]]
+        murphy = self.design.copy()
+        murphy.bedframe.angle = row['angle']
+        murphy.state = tuple(row[self.state_fields].tolist())
+        return murphy
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['rows'] = self.states.copy()
+        return state
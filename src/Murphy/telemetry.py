@@ -0,0 +1,67 @@
+'''Solver instrumentation.
+
+Murphy.assemble, MurphyBed.solve_over_full_range and MurphyBed.evaluate_murphy_error report to the module-level
+telemetry object. It is disabled by default, which costs one attribute check per call. Once enabled it keeps
+running counters and passes every event to subscribed callbacks and, optionally, to a JSONL stream:
+
+    from Murphy.telemetry import telemetry
+    telemetry.enable('solver.jsonl')
+    telemetry.subscribe(lambda event: print(event) if not event.get('assembled', True) else None)
+    ...
+    telemetry.counters['assemble.iterations'], telemetry.counters['sweep.seconds']
+
+Events are dicts with 'event' ('assemble', 'sweep' or 'objective'), 'time' and event-specific fields.
+'''
+from collections import defaultdict
+import json
+import time
+
+class Telemetry():
+    # fields summed into counters as '<event>.<field>'; every event also counts '<event>.calls'
+    summed = {'iterations', 'ikea_evaluations', 'failed', 'rejected_steps', 'angles', 'seconds'}
+
+    def __init__(self):
+        self.enabled = False
+        self.subscribers = []
+        self._stream = None
+        self._owns_stream = False
+        self.reset()
+
+    def reset(self):
+        self.counters = defaultdict(float)
+
+    def enable(self, stream = None):
+        '''Start collecting. stream is an optional path or open text file that receives one JSON line per event.'''
+        self.disable()
+        if isinstance(stream, str):
+            self._stream, self._owns_stream = open(stream, 'a'), True
+        else:
+            self._stream, self._owns_stream = stream, False
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        if self._owns_stream:
+            self._stream.close()
+        self._stream, self._owns_stream = None, False
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def emit(self, event, **data):
+        '''Record one event. Callers check self.enabled first, so nothing is built when telemetry is off.'''
+        record = {'event': event, 'time': time.time()}
+        record.update(data)
+        self.counters[event + '.calls'] += 1
+        for key, value in data.items():
+            if key in self.summed:
+                self.counters[event + '.' + key] += value
+        for callback in self.subscribers:
+            callback(record)
+        if self._stream is not None:
+            self._stream.write(json.dumps(record, default = float) + '\n')
+
+telemetry = Telemetry()
@@ -0,0 +1,142 @@
+'''Monte Carlo tolerance analysis: how a design behaves once it is built.
+
+Every design variable (see Design.names) is perturbed by a random manufacturing error, and each perturbed design
+is solved at every angle of the sweep with the batch four-bar solve (kinematics.assemble_four_bar), all samples
+and angles as one set of array operations. Per sample the worst case over the sweep is kept: the largest
+ikea_error (how far the built bed is from closing), the floor opening and the extents of the assembly.
+
+    analysis = ToleranceAnalysis(murphy_bed, {'A.x': 0.04, 'B.length': ('uniform', 0.02)}, samples = 5000)
+    summary = analysis.run()
+    summary['yield'], summary['sensitivity']['residual']
+
+A tolerance t means the variable is built within +-t inches: 'normal' errors have a standard deviation of t/3,
+'uniform' ones are spread evenly over +-t. Variables left out get default_tolerance. The branch of the linkage
+each sample assembles in is the one nearest the nominal design's pose, so a sample that would have to be forced
+through a dead point to follow the nominal motion shows up as a residual rather than as a smooth other branch.
+'''
+import numpy as np
+from Murphy.design import Design
+from Murphy.kinematics import assemble_four_bar, attachment_offset, bedframe_geometry, link_geometry, link_distal
+
+default_tolerance = 0.04 # about a millimetre
+
+class ToleranceAnalysis():
+    '''Samples of murphy_bed's design built with tolerances ({design variable: t or (distribution, t)}),
+    evaluated at angles bed angles from deployed (0) to stowed (90)'''
+    # (lowest, highest) acceptable value of each checked metric; None is unbounded
+    limits = {'residual': (None, 0.125), 'left': (0, None), 'floor_excess': (None, 0)}
+    chunk = 10000 # samples solved at once, bounding memory to a few arrays of chunk x angles
+
+    def __init__(self, murphy_bed, tolerances = None, samples = 1000, angles = 91, seed = 0, limits = None):
+        self.murphy_bed = murphy_bed
+        self.samples = samples
+        self.angles = np.linspace(0, 90, angles)
+        self.rng = np.random.default_rng(seed)
+        self.limits = dict(self.limits, **(limits or {}))
+        solutions = murphy_bed.collected_solutions
+        self.design = solutions.design
+        if not self.design.four_bar:
+            raise ValueError('Tolerance analysis solves four-bar linkages only, two links from the room to the bedframe')
+        self.nominal = Design.from_murphy(self.design)
+        tolerances = tolerances or {}
+        unknown = set(tolerances) - set(self.nominal.names)
+        if unknown:
+            raise ValueError('{} not design variables, expected some of {}'.format(', '.join(sorted(unknown)), ', '.join(self.nominal.names)))
+        self.tolerances = [tolerances.get(name, default_tolerance) for name in self.nominal.names]
+
+        # the nominal pose at each angle, to pick the branch of every sample; A's angle is interpolated between
+        # the solved angles and the nominal design is then solved exactly there
+        states = solutions.states
+        A = self.design.A
+        A_angle = np.degrees(np.unwrap(np.radians(states['A_angle'])))
+        guess = link_distal(A.x, A.y, A.length, np.interp(self.angles, states['angle'], A_angle))
+        pose = self._solve(self.nominal.values[None], tuple(guess.xy[None].transpose(2, 0, 1)))
+        self.reference = tuple(link_distal(A.x, A.y, A.length, pose['A_angle']).xy.transpose(2, 0, 1))
+
+    def perturbations(self, n):
+        '''n random manufacturing errors, one row per sample and one column per design variable'''
+        errors = np.empty((n, len(self.tolerances)))
+        for i, tolerance in enumerate(self.tolerances):
+            distribution, t = tolerance if isinstance(tolerance, (tuple, list)) else ('normal', tolerance)
+            if distribution == 'normal':
+                errors[:, i] = self.rng.normal(0, t/3, n)
+            elif distribution == 'uniform':
+                errors[:, i] = self.rng.uniform(-t, t, n)
+            else:
+                raise ValueError('Unknown distribution {!r}, expected normal or uniform'.format(distribution))
+        return errors
+
+    def _solve(self, values, reference):
+        '''The pose of designs (rows of design values) at every angle, arrays of (designs, angles)'''
+        links = []
+        for i in range(2):
+            x, y, length, u, v = values[:, 5*i:5*i+5, None].transpose(1, 0, 2)
+            links.append((x, y, length) + attachment_offset(u, v))
+        return assemble_four_bar(self.angles, *links, reference = reference)
+
+    def metrics(self, values):
+        '''Worst case over the sweep of each metric, for designs (rows of design values)'''
+        pose = self._solve(values, self.reference)
+        bedframe = self.design.bedframe
+        components = [bedframe_geometry(pose['x'], pose['y'], bedframe.t, bedframe.l, bedframe.margin, self.angles)]
+        for i, link in enumerate([self.design.A, self.design.B]):
+            x, y, length = values[:, 5*i:5*i+3, None].transpose(1, 0, 2)
+            components.append(link_geometry(x, y, length, link.width, pose[['A_angle', 'B_angle'][i]]))
+        floor_opening = np.maximum.reduce([component['floor_opening'] for component in components]).max(axis = 1)
+        extents = {side: [component['extents'][side] for component in components] for side in ['left', 'right', 'top']}
+        return {'residual': pose['residual'].max(axis = 1),
+                'assembled': pose['assembled'].all(axis = 1),
+                'floor_opening': floor_opening,
+                # how far the floor opening reaches past the stowed bed, as murphy_error term 7 compares them
+                'floor_excess': floor_opening - pose['x'][:, -1],
+                'left': np.minimum.reduce(extents['left']).min(axis = 1),
+                'right': np.maximum.reduce(extents['right']).max(axis = 1),
+                'top': np.maximum.reduce(extents['top']).max(axis = 1),
+                'deployed_height': pose['y'][:, 0] + bedframe.t,
+                'stowed_height': pose['y'][:, -1] + bedframe.l}
+
+    def passes(self, metrics):
+        '''Whether each sample meets each of limits'''
+        checks = {}
+        for name, (low, high) in self.limits.items():
+            value = metrics[name]
+            checks[name] = np.ones(len(value), dtype = bool)
+            if low is not None: checks[name] &= value >= low
+            if high is not None: checks[name] &= value <= high
+        return checks
+
+    def run(self):
+        '''Sample, solve and summarize. The samples are kept as self.errors and their metrics as self.results.'''
+        self.errors = self.perturbations(self.samples)
+        results = [self.metrics(self.nominal.values + self.errors[i:i+self.chunk]) for i in range(0, self.samples, self.chunk)]
+        self.results = {name: np.concatenate([result[name] for result in results]) for name in results[0]}
+        self.nominal_results = {name: value[0] for name, value in self.metrics(self.nominal.values[None]).items()}
+        return self.summary()
+
+    def sensitivities(self, name):
+        '''d metric / d variable for every design variable, from a least squares fit of the metric against the
+        errors, and the share of the metric's variance each variable accounts for'''
+        value = self.results[name].astype(float)
+        X = np.column_stack([np.ones(self.samples), self.errors])
+        slope = np.linalg.lstsq(X, value, rcond = None)[0][1:]
+        variance = value.var()
+        share = slope**2*self.errors.var(axis = 0)/variance if variance > 0 else np.zeros_like(slope)
+        return {variable: {'slope': float(s), 'share': float(f)} for variable, s, f in zip(self.nominal.names, slope, share)}
+
+    def summary(self):
+        checks = self.passes(self.results)
+        nominal = self.passes({name: np.atleast_1d(value) for name, value in self.nominal_results.items()})
+        statistics = {}
+        for name, value in self.results.items():
+            value = value.astype(float)
+            statistics[name] = {'nominal': float(self.nominal_results[name]), 'mean': float(value.mean()), 'std': float(value.std()),
+                                'min': float(value.min()), 'max': float(value.max()),
+                                'p05': float(np.percentile(value, 5)), 'p95': float(np.percentile(value, 95))}
+        worst = int(np.argmax(self.results['residual']))
+        return {'samples': self.samples,
+                'yield': float(np.logical_and.reduce(list(checks.values())).mean()),
+                'pass_rates': {name: float(check.mean()) for name, check in checks.items()},
+                'nominal_passes': {name: bool(check[0]) for name, check in nominal.items()},
+                'metrics': statistics,
+                'sensitivity': {name: self.sensitivities(name) for name in self.limits},
+                'worst': dict(zip(self.nominal.names, (self.nominal.values + self.errors[worst]).tolist()))}
@@ -0,0 +1,167 @@
+'''Timing benchmarks for assemble, the full-range sweep, murphy_error and the optimizer.
+
+    python benchmark.py run --output baseline.json
+    python benchmark.py run --output current.json
+    python benchmark.py compare baseline.json current.json --threshold 0.2
+
+Each benchmark reports the best time per call in seconds over several repeats. compare exits with status 1 if
+any benchmark is slower than its baseline by more than threshold (a fraction, 0.2 = 20%), or if importing the
+compute core loaded any of the heavy optional modules (plotting, sklearn) that it must not depend on.
+'''
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+import numpy as np
+from Murphy.link import Link
+from Murphy.bedframe import Bedframe
+from Murphy.murphy import Murphy
+from Murphy.murphy_bed import MurphyBed
+from Murphy.optimize import StoppingCriteria
+
+def reference_design():
+    '''The design from murphy.py'''
+    bedframe = Bedframe(10,4,10, 72, 12, 8)
+    A_link = Link(x=0,y=0,length=10,width=4,angle=80, color = 'r', bedframe = bedframe, attachment = (5,2))
+    B_link = Link(x=20, y = -1, length = 10, width = 4, angle = 110, color ='g', bedframe = bedframe, attachment = (18,2))
+    return Murphy(bedframe, A_link, B_link)
+
+def near_singular_design():
+    '''Links whose combined reach barely spans their pivots, so the linkage passes close to a toggle position'''
+    bedframe = Bedframe(10,4,10, 72, 12, 8)
+    A_link = Link(x=0,y=0,length=12,width=4,angle=80, color = 'r', bedframe = bedframe, attachment = (5,2))
+    B_link = Link(x=24, y = -1, length = 6, width = 4, angle = 110, color ='g', bedframe = bedframe, attachment = (18,2))
+    return Murphy(bedframe, A_link, B_link)
+
+def long_link_design():
+    '''Long links attached near the ends of the bedframe, a large, fast-moving linkage'''
+    bedframe = Bedframe(10,4,10, 72, 12, 8)
+    A_link = Link(x=0,y=5,length=30,width=4,angle=60, color = 'r', bedframe = bedframe, attachment = (2,5))
+    B_link = Link(x=40, y = 0, length = 25, width = 4, angle = 100, color ='g', bedframe = bedframe, attachment = (60,5))
+    return Murphy(bedframe, A_link, B_link)
+
+designs = {'reference': reference_design, 'near_singular': near_singular_design, 'long_links': long_link_design}
+
+def best_time(function, number = 10, repeat = 5):
+    '''Best mean time per call of function over repeat runs of number calls'''
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start)/number)
+    return min(times)
+
+def assemble_benchmark(make, angle, method):
+    def run():
+        murphy = make()
+        murphy.bedframe.angle = angle
+        murphy.assemble(method = method)
+    return run
+
+def sweep_benchmark(make, steps):
+    def run():
+        MurphyBed(make(), 15, 40).solve_over_full_range(steps)
+    return run
+
+def murphy_error_benchmark(make):
+    murphy_bed = MurphyBed(make(), 15, 40)
+    murphy_bed.solve_over_full_range(5)
+    return murphy_bed.evaluate_murphy_error
+
+def optimize_benchmark(make, cycles):
+    def run():
+        murphy_bed = MurphyBed(make(), 15, 40)
+        murphy_bed.solve_over_full_range(5)
+        murphy_bed.optimize('evolution', 5, processes = 1, stopping = StoppingCriteria(max_iterations = cycles), population = 8, seed = 0)
+    return run
+
+heavy_modules = ['matplotlib', 'sklearn']
+
+def import_time(repeat = 5):
+    '''Best time to import the compute core in a fresh interpreter, after numpy, and the heavy modules it loaded'''
+    code = ('import json, sys, time, numpy; start = time.perf_counter(); '
+            'import Murphy.murphy_bed, Murphy.parallel, Murphy.optimize, Murphy.batch; '
+            'print(json.dumps([time.perf_counter() - start, [m for m in {!r} if m in sys.modules]]))').format(heavy_modules)
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], cwd = os.path.dirname(os.path.abspath(__file__)),
+                                capture_output = True, text = True, check = True).stdout
+        seconds, loaded = json.loads(output)
+        times.append(seconds)
+    return min(times), loaded
+
+def run_benchmarks(quick = False):
+    scale = 0.2 if quick else 1
+    number = lambda n: max(1, int(n*scale))
+    results = {}
+    results['import/core'], heavy_imports = import_time()
+    for name, make in designs.items():
+        for angle in [0, 45, 90]:
+            results['assemble/analytic/{}/{}'.format(name, angle)] = best_time(assemble_benchmark(make, angle, 'analytic'), number(1000))
+        results['assemble/iterative/{}/45'.format(name)] = best_time(assemble_benchmark(make, 45, 'iterative'), 1, 3)
+        for steps in [5, 19, 91]:
+            results['sweep/{}/{}'.format(name, steps)] = best_time(sweep_benchmark(make, steps), number(20))
+        results['murphy_error/{}'.format(name)] = best_time(murphy_error_benchmark(make), number(100))
+    results['optimize/reference/10'] = best_time(optimize_benchmark(reference_design, 10), 1, 3)
+    return {'meta': {'date': datetime.now().isoformat(timespec = 'seconds'), 'python': platform.python_version(),
+                     'numpy': np.__version__, 'machine': platform.machine(), 'quick': quick, 'heavy_imports': heavy_imports},
+            'results': results}
+
+def compare(baseline, current, threshold):
+    '''Print the change of every benchmark in current against baseline; returns the names that regressed'''
+    regressions = []
+    for name, seconds in sorted(current['results'].items()):
+        before = baseline['results'].get(name)
+        if before is None:
+            print('{:45s} {:>12.6f}s  (new)'.format(name, seconds))
+            continue
+        change = seconds/before - 1
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print('{:45s} {:>12.6f}s  {:+7.1%}{}'.format(name, seconds, change, flag))
+    return regressions
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest = 'command', required = True)
+    run = commands.add_parser('run', help = 'run the benchmarks and write the results as JSON')
+    run.add_argument('--output', help = 'file to write, default stdout')
+    run.add_argument('--quick', action = 'store_true', help = 'fewer calls per benchmark')
+    check = commands.add_parser('compare', help = 'compare two result files')
+    check.add_argument('baseline')
+    check.add_argument('current')
+    check.add_argument('--threshold', type = float, default = 0.2)
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        results = json.dumps(run_benchmarks(args.quick), indent = 2)
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(results + '\n')
+        else:
+            print(results)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.threshold)
+    heavy_imports = current['meta'].get('heavy_imports')
+    if heavy_imports:
+        print('Importing the compute core loaded {}'.format(', '.join(heavy_imports)))
+        return 1
+    if regressions:
+        print('{} benchmark(s) slower than baseline by more than {:.0%}'.format(len(regressions), args.threshold))
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
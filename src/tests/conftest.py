@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the tests import Murphy and benchmark from src, wherever pytest is run from
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
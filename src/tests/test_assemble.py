@@ -0,0 +1,45 @@
+from math import hypot
+import numpy as np
+import pytest
+from benchmark import reference_design
+
+def solved(angle, method = 'analytic', start = None):
+    murphy = reference_design()
+    murphy.bedframe.angle = angle
+    if start is not None:
+        murphy.state = start
+    assembled = murphy.assemble(method = method)
+    return murphy, assembled
+
+@pytest.mark.parametrize('angle', [0, 20, 45])
+def test_analytic_matches_newton_and_iterative(angle):
+    analytic, assembled = solved(angle)
+    assert assembled
+    assert analytic.ikea_error < 1e-12
+    # start a little off the analytic pose, so each solver has to find it
+    start = tuple(np.array(analytic.state) + [1, -1, 3, -3])
+    newton, assembled = solved(angle, 'newton', start)
+    assert assembled
+    np.testing.assert_allclose(newton.state, analytic.state, atol = 1e-6)
+    # coordinate descent stops once ikea_error is below 0.125
+    iterative, assembled = solved(angle, 'iterative', start)
+    assert assembled
+    np.testing.assert_allclose(iterative.state[:2], analytic.state[:2], atol = 0.5)
+    np.testing.assert_allclose(iterative.state[2:], analytic.state[2:], atol = 5)
+
+def test_analytic_splits_the_gap_when_the_linkage_cannot_close():
+    murphy, assembled = solved(90)
+    assert not assembled
+    A, B = murphy.A, murphy.B
+    a, b = A.room_attachment, B.room_attachment
+    # A's distal end and B's shifted by the attachment offset would have to meet, but the circles they are on do not
+    d = hypot(B.x - (b['x'] - a['x']) - A.x, B.y - (b['y'] - a['y']) - A.y)
+    gap = d - A.length - B.length
+    assert gap > 0
+    for link in [A, B]:
+        assert link.ikea_error == pytest.approx((gap/2)**2)
+    assert murphy.ikea_error == pytest.approx(gap**2/2)
+    # no other pose gets closer
+    newton, assembled = solved(90, 'newton', murphy.state)
+    assert not assembled
+    assert newton.ikea_error == pytest.approx(murphy.ikea_error)
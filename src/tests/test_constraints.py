@@ -0,0 +1,52 @@
+from math import atan2, degrees, hypot
+import numpy as np
+import pytest
+from benchmark import reference_design
+from Murphy.constraints import LoopClosure
+from Murphy.link import Link
+from Murphy.murphy import Murphy
+
+def chained_design():
+    '''The reference four-bar with a chain from the room to A: C pivots in the room, D is mounted on C's distal end
+    and attached to A, 5 along it. Built closed at bed angle 0.'''
+    murphy = reference_design()
+    murphy.bedframe.angle = 0
+    murphy.assemble()
+    A = murphy.A
+    c, s = A.trig
+    px, py = A.x + 5*c, A.y + 5*s
+    C = Link(x = 6, y = -4, length = 4, width = 2, angle = 150, color = 'b', bedframe = murphy.bedframe)
+    X, Y = C.distal
+    D = Link(x = X, y = Y, length = hypot(px - X, py - Y), width = 2, angle = degrees(atan2(py - Y, px - X)), color = 'm',
+             bedframe = murphy.bedframe, attachment = (5, 0), mount = C, attached_to = A)
+    return Murphy(murphy.bedframe, murphy.A, murphy.B, C, D)
+
+def test_jacobian_matches_finite_differences():
+    murphy = chained_design()
+    murphy.state = tuple(np.array(murphy.state) + [0.3, -0.2, 2, -1, 3, -2])
+    constraints = LoopClosure(murphy)
+    r, (rows, columns, values) = constraints.evaluate()
+    J = np.zeros(constraints.shape)
+    np.add.at(J, (rows, columns), values)
+    state, h = np.array(murphy.state), 1e-6
+    numeric = np.zeros_like(J)
+    for k in range(len(state)):
+        for sign in [1, -1]:
+            murphy.state = tuple(state + sign*h*np.eye(len(state))[k])
+            numeric[:, k] += sign*constraints.evaluate()[0]/(2*h)
+    np.testing.assert_allclose(J, numeric, atol = 1e-5)
+
+@pytest.mark.parametrize('angle', [0, 30])
+def test_closes_every_loop(angle):
+    murphy = chained_design()
+    murphy.bedframe.angle = angle
+    murphy.state = tuple(np.array(murphy.state) + [0.5, -0.5, 3, -3, 4, -4])
+    LoopClosure(murphy).solve()
+    assert murphy.ikea_error < LoopClosure.tolerance
+    # D stays on C's distal end, and the chain does not move the four-bar off its own solution
+    assert (murphy.D.x, murphy.D.y) == pytest.approx(murphy.C.distal)
+    four_bar = reference_design()
+    four_bar.bedframe.angle = angle
+    four_bar.state = murphy.state[:4]
+    assert four_bar.assemble()
+    np.testing.assert_allclose(murphy.state[:4], four_bar.state, atol = 1e-6)
@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+
+src = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, src)
+from benchmark import heavy_modules, import_time
+
+# generous, about 40 times what importing the compute core takes on a laptop
+max_import_seconds = 1.0
+
+def test_murphy_does_not_import_heavy_modules():
+    # a fresh interpreter, as anything imported by the test run itself would already be in sys.modules
+    check = ("import sys\n"
+             "from Murphy.bedframe import Bedframe\n"
+             "from Murphy.link import Link\n"
+             "from Murphy.murphy import Murphy\n"
+             "from Murphy.murphy_bed import MurphyBed\n"
+             "loaded = [name for name in {!r} if name in sys.modules]\n"
+             "assert not loaded, 'imported ' + ', '.join(loaded)").format(heavy_modules)
+    subprocess.run([sys.executable, '-c', check], cwd = src, check = True)
+
+def test_import_time():
+    seconds, loaded = import_time(repeat = 3)
+    assert not loaded
+    assert seconds < max_import_seconds, 'importing the compute core took {:.2f} s'.format(seconds)
@@ -0,0 +1,35 @@
+import numpy as np
+from benchmark import reference_design
+from Murphy.design import Design
+from Murphy.kinematics import assemble_four_bar, attachment_offset
+
+def test_assemble_four_bar_matches_the_scalar_solve():
+    rng = np.random.default_rng(0)
+    nominal = Design.from_murphy(reference_design())
+    designs = nominal.values + rng.normal(0, 0.5, (20, len(nominal.values)))
+    angles = np.array([0, 15, 45, 70, 90])
+    links = []
+    for i in range(2):
+        # one row per design, broadcasting against the angles
+        x, y, length, u, v = designs[:, 5*i:5*i+5, None].transpose(1, 0, 2)
+        links.append((x, y, length) + attachment_offset(u, v))
+
+    # every scalar solve starts from the reference pose, and the batch one takes the branch nearest it
+    expected = {name: np.zeros((len(designs), len(angles))) for name in ['x', 'y', 'A_angle', 'B_angle', 'residual', 'assembled']}
+    reference = np.zeros((2, len(designs), len(angles)))
+    for i, values in enumerate(designs):
+        for j, angle in enumerate(angles):
+            murphy = nominal.with_values(values).apply(reference_design())
+            murphy.bedframe.angle = angle
+            reference[:, i, j] = murphy.A.distal
+            expected['assembled'][i, j] = murphy.assemble()
+            expected['x'][i, j], expected['y'][i, j], expected['A_angle'][i, j], expected['B_angle'][i, j] = murphy.state
+            expected['residual'][i, j] = murphy.ikea_error
+    pose = assemble_four_bar(angles, *links, reference = tuple(reference))
+
+    assert expected['assembled'].any() and not expected['assembled'].all()
+    np.testing.assert_array_equal(pose['assembled'], expected['assembled'])
+    for name in ['x', 'y', 'residual']:
+        np.testing.assert_allclose(pose[name], expected[name], atol = 1e-9)
+    for name in ['A_angle', 'B_angle']:
+        np.testing.assert_allclose((pose[name] - expected[name] + 180) % 360 - 180, 0, atol = 1e-9)
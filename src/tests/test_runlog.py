@@ -0,0 +1,31 @@
+import os
+import numpy as np
+from Murphy.runlog import RunLog, read_run_log
+
+names = ['A.x', 'A.y', 'B.x']
+
+def record(i):
+    return {'iteration': i, 'evaluations': 10*i, 'error': 100.0 - i, 'step': 0.5, 'design': np.arange(3) + i,
+            'errors': np.full(4, float(i))}
+
+def test_torn_last_record_is_dropped_on_reopen(tmp_path):
+    path = str(tmp_path/'run.runlog')
+    with RunLog(path, names, 4, buffer = 1) as log:
+        for i in range(3):
+            log.append(record(i))
+    size = os.path.getsize(path)
+    itemsize = log.dtype.itemsize
+    # a run killed part way through writing its fourth record
+    with open(path, 'ab') as f:
+        f.write(b'\x01'*(itemsize//2))
+    assert len(read_run_log(path)[1]) == 3
+
+    with RunLog(path, names, 4, buffer = 1) as log:
+        assert len(log) == 3
+        assert os.path.getsize(path) == size
+        log.append(record(3))
+        last = log.last()
+    assert last['cycle'] == 3 and last['error'] == 97
+    _, records = read_run_log(path)
+    np.testing.assert_array_equal(records['cycle'], np.arange(4))
+    np.testing.assert_array_equal(records['design'][-1], [3, 4, 5])